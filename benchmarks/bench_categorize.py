@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the giro transaction categorization: one ``str.contains`` pass
+per rule against comdirectpdfparser.categorize, for a growing number of rules.
+
+Run with ``python benchmarks/bench_categorize.py``.
+"""
+import random
+import timeit
+
+import pandas as pd
+
+from comdirectpdfparser.categorize import Categorizer
+
+
+def rules(n: int, regex: bool = False) -> list:
+    if regex:
+        # regular expression rules, prefiltered by their required literal
+        return [(f"category{i % 20}", rf"(?:Lastschrift|Übertrag)\s+Auftraggeber: PAYEE{i:04d}\b") for i in range(n)]
+    return [(f"category{i % 20}", f"PAYEE{i:04d}") for i in range(n)]
+
+
+def transactions(n: int, payees: int = 500) -> pd.DataFrame:
+    random.seed(0)
+    return pd.DataFrame(
+        {
+            "type": [random.choice(["Lastschrift", "Übertrag", "Kartenverfügung"]) for _ in range(n)],
+            "details": [f"Auftraggeber: PAYEE{random.randrange(payees):04d} Ref. {i}" for i in range(n)],
+        }
+    )
+
+
+def categorizeLegacy(df: pd.DataFrame, _rules: list) -> pd.Series:
+    """One pass per rule, the first matching rule wins."""
+    category = pd.Series("other", index=df.index)
+    text = df["type"] + "\n" + df["details"]
+    for name, pattern in reversed(_rules):
+        category[text.str.contains(pattern, case=False)] = name
+    return category
+
+
+if __name__ == "__main__":
+    df = transactions(20000)
+    # the reference numbers make every details string unique, this is the worst case for the cache
+    dfrepeated = df.assign(details=df["details"].str.replace(r" Ref\. \d+", "", regex=True))
+
+    for regex in (False, True):
+        for n in (10, 100, 1000):
+            _rules = rules(n, regex)
+            results = {
+                "str.contains per rule": lambda: categorizeLegacy(df, _rules),
+                "Categorizer unique": lambda: Categorizer(_rules).categorizeFrame(df),
+                "Categorizer repeated": lambda: Categorizer(_rules).categorizeFrame(dfrepeated),
+            }
+
+            print(f"{'regex' if regex else 'literal'} rules = {n}")
+            for name, func in results.items():
+                t = min(timeit.repeat(func, number=1, repeat=3))
+                print(f"    {name:<24s} {t * 1e3:10.1f} ms")
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the German number conversion: the original stringToNumber
+implementation against comdirectpdfparser.numparse.
+
+Run with ``python benchmarks/bench_numparse.py``.
+"""
+import random
+import timeit
+
+import pandas as pd
+
+from comdirectpdfparser.numparse import parseNumber, parseNumbers
+
+
+def stringToNumberLegacy(s: str) -> float:
+    """Original implementation, without validation."""
+    return float(s.replace(".", "").replace(",", "."))
+
+
+def values(n: int) -> list:
+    random.seed(0)
+    out = []
+    for _ in range(n):
+        v = random.uniform(-100000, 100000)
+        s = f"{v:+,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        out.append(s)
+    return out
+
+
+if __name__ == "__main__":
+    for n in (100, 10000, 1000000):
+        data = values(n)
+        series = pd.Series(data)
+        repeat = max(1, 100000 // n)
+
+        results = {
+            "legacy apply": lambda: series.apply(stringToNumberLegacy),
+            "parseNumber apply": lambda: series.apply(parseNumber),
+            "parseNumbers": lambda: parseNumbers(series),
+            "parseNumbers decimal": lambda: parseNumbers(series, decimal=True),
+        }
+
+        print(f"n = {n}")
+        for name, func in results.items():
+            t = min(timeit.repeat(func, number=repeat, repeat=3)) / repeat
+            print(f"    {name:<22s} {t * 1e3:10.3f} ms   {t / n * 1e9:8.1f} ns/value")
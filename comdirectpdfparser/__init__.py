@@ -9,21 +9,35 @@ Top-level package for comdirectpdfparser.
 
 __version__ = "0.0.0"
 
+import logging
 import os
 import re
-from typing import Dict, List, Tuple
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, List, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-from pymongo import ASCENDING, MongoClient
+from pymongo import ASCENDING, MongoClient, ReplaceOne, UpdateOne, WriteConcern
 from pymongo.errors import BulkWriteError
 from tqdm import tqdm
 
 from . import log
-from .utils import readRaw, stringToNumber
+from .categorize import Categorizer
+from .columnar import ColumnStore, toDocument
+from .dedup import DocumentIndex
+from .fxrates import FXRateStore
+from .metrics import Metrics
+from .numparse import parseNumbers
+from .profiler import PatternProfiler
+from .textstore import TextStore
+from .utils import readPages, readRaw, stringToDate, stringToNumber
 
 regexdecimal = "(\d+(?:\.\d+)?,\d+)"
 
+# per-document messages, see log.SamplingFilter to keep only a fraction of them
+doclog = logging.getLogger(__name__ + ".documents")
+
 
 class ComDirectParser:
     """
@@ -55,17 +69,106 @@ class ComDirectParser:
         "Finanzreport": "finanzreport",
     }
 
-    def __init__(self, inputlist: list, client: MongoClient) -> None:
+    # mongo collection per docutype
+    collectionDict = {
+        "divertrags": "div",
+        "div": "div",
+        "buy": "buy_sell",
+        "sell": "buy_sell",
+        "tax": "tax",
+    }
+
+    # in-memory result attribute per mongo collection
+    resultDict = {
+        "div": "divparsed",
+        "tax": "taxparsed",
+        "buy_sell": "buysellparsed",
+        "saldos": "saldos",
+        "giroTransactions": "girotransactions",
+    }
+
+    # indexes per collection: (index keys, unique)
+    _uniqueDocIndex = (
+        [("Date", ASCENDING), ("Tax Reference Number", ASCENDING), ("filename", ASCENDING)],
+        True,
+    )
+    indexDict = {
+        "div": [
+            _uniqueDocIndex,
+            # dividends per isin / account and date range, covering the net amount
+            ([("isin", ASCENDING), ("Date", ASCENDING), ("Net Before Tax", ASCENDING)], False),
+            ([("Account", ASCENDING), ("Date", ASCENDING), ("Net Before Tax", ASCENDING)], False),
+        ],
+        "tax": [
+            _uniqueDocIndex,
+            ([("Tax Reference Number", ASCENDING)], False),
+        ],
+        "buy_sell": [
+            _uniqueDocIndex,
+            ([("isin", ASCENDING), ("Date", ASCENDING), ("Type", ASCENDING)], False),
+            ([("Account", ASCENDING), ("Type", ASCENDING), ("Date", ASCENDING)], False),
+        ],
+        "saldos": [
+            ([("date", ASCENDING), ("name", ASCENDING)], True),
+            ([("account", ASCENDING), ("date", ASCENDING)], False),
+            # lookups by file for reparse()
+            ([("filename", ASCENDING)], False),
+        ],
+        "giroTransactions": [
+            ([("date", ASCENDING), ("type", ASCENDING)], True),
+            ([("filename", ASCENDING)], False),
+            ([("category", ASCENDING), ("date", ASCENDING)], False),
+        ],
+    }
+
+    # docutypes with data beyond the first pages, see headPages
+    fullTextTypes = ("finanzreport",)
+
+    # collections holding several records per document
+    multiRecordCollections = ("saldos", "giroTransactions")
+
+    # increase whenever a parser change alters the parsed output,
+    # reparse() will then update the stored documents
+    PARSER_VERSION = 3
+
+    def __init__(
+        self,
+        inputlist: list,
+        client: MongoClient,
+        textstore: TextStore = None,
+        profiler: PatternProfiler = None,
+        dedup: DocumentIndex = None,
+        metrics: Metrics = None,
+        headPages: int = 2,
+        categorizer: Categorizer = None,
+    ) -> None:
         # log.setup()
         self.folders = []
         self.files = []
         self.filelist = []
-        self.divparsed = []
-        self.buysellparsed = []
-        self.taxparsed = []
-        self.saldos = []
-        self.girotransactions = []
+        self.divparsed = ColumnStore()
+        self.buysellparsed = ColumnStore()
+        self.taxparsed = ColumnStore()
+        self.saldos = ColumnStore()
+        self.girotransactions = ColumnStore()
+        self.parsedfiles = []
+        # collection - path of the file of every collected record, see checkpoint()
+        self.sources = {collection: [] for collection in self.resultDict}
+        self.fxrates = FXRateStore()
         self.client = client
+        self.textstore = textstore
+        self.profiler = profiler
+        self.dedup = dedup
+        self.duplicates = []
+        # (file, error) of the files skipped by parse(skipErrors=True)
+        self.failed = []
+        self.metrics = metrics
+        # pages extracted to classify a document, None to always extract all pages
+        self.headPages = headPages
+        self.categorizer = categorizer
+
+        # all pattern evaluations go through _findall, so they can be timed
+        self._findall = profiler.findall if profiler is not None else re.findall
 
         # if inputlist is single file make a list out of it
         if isinstance(inputlist, list):
@@ -89,73 +192,280 @@ class ComDirectParser:
                 if not file.startswith("."):
                     self.filelist.append(os.path.join(folder, file))
 
-    def parse(self) -> Tuple[List[Dict]]:
+    def parse(self, filelist: List[str] = None, skipErrors: bool = False) -> Tuple[pd.DataFrame]:
         """General parser that will go through all give files (also in given folders)
         and try to parse them.
 
+        Args:
+            filelist (List[str], optional): files to parse instead of the discovered ones. Defaults to None.
+            skipErrors (bool, optional): log files that can not be extracted or parsed, keep them
+                in failed and continue with the next file, instead of raising. Defaults to False.
+
         Returns:
-            Tuple[List[Dict]]: parsed data
+            Tuple[pd.DataFrame]: parsed data (div, buy/sell, tax, saldos, giro transactions)
         """
-        for _file in tqdm(self.filelist):
-            # log.info(_file)
-            # return dict
-            parsed = {"filename": _file.split("/")[-1]}
-
-            # load pdf data
-            raw = readRaw(_file)
-            rawText = raw["content"]
-
-            docutypere = "(" + ("|").join(self.docuDict.keys()) + ")"
-            docutype = re.findall(f"{docutypere}", rawText)
-            # log.info(docutype[0])
-
-            if docutype:
-                _doctype = self.docuDict[docutype[0]]
-                parsed = {**parsed, **{"Type": self.docuDict[docutype[0]]}}
-            else:
-                print(_file)
-                continue
-            # log.info(parsed)
+        filelist = self.filelist if filelist is None else filelist
+        metrics = self.metrics
+
+        # the metrics replace the progress bar, e.g. when running as a service
+        for i, _file in enumerate(tqdm(filelist, disable=metrics is not None)):
+            doclog.debug("reading %s", _file)
+            if metrics is not None:
+                metrics.queue("files", len(filelist) - i)
+            try:
+                self._parseFile(_file)
+            except Exception as e:
+                if not skipErrors:
+                    raise
+                doclog.exception("failed to parse %s", _file)
+                self.failed.append((_file, repr(e)))
+                if metrics is not None:
+                    metrics.document("failed")
+
+        if metrics is not None:
+            metrics.queue("files", 0)
 
-            if docutype not in ["finanzreport"]:
-                accountDict = self.parse_account(rawText, _doctype)
-                parsed = {**parsed, **accountDict}
-            # log.info(parsed)
+        return (
+            self.divparsed.toDataFrame(),
+            self.buysellparsed.toDataFrame(),
+            self.taxparsed.toDataFrame(),
+            self.saldos.toDataFrame(),
+            self.girotransactions.toDataFrame(),
+        )
 
-            if _doctype == "div":
-                parsed = {**parsed, **self.parse_div(rawText, accountDict)}
-                self.divparsed.append(parsed)
+    def _parseFile(self, _file: str) -> None:
+        """Extract, parse and collect a single file."""
+        metrics = self.metrics
+        filename = _file.split("/")[-1]
+
+        # same content already ingested under another name
+        if self.dedup is not None:
+            duplicate, filehash = self.dedup.checkFile(_file)
+            if duplicate:
+                self.duplicates.append(_file)
+                doclog.info("duplicate file: %s", _file)
+                if metrics is not None:
+                    metrics.document("duplicate")
+                return
+
+        # load pdf data
+        start = perf_counter()
+        rawText = self.readText(_file)
+        if metrics is not None:
+            metrics.observe("extract", perf_counter() - start)
+
+        if self.dedup is not None:
+            duplicate, texthash = self.dedup.checkText(rawText)
+            if duplicate:
+                self.duplicates.append(_file)
+                doclog.info("duplicate text: %s", _file)
+                if metrics is not None:
+                    metrics.document("duplicate")
+                return
+
+        start = perf_counter()
+        parsed = self.parse_document(filename, rawText)
+        self.parsedfiles.append(filename)
+        # only parsed documents are registered, flushed with their records in save()
+        if self.dedup is not None:
+            self.dedup.add(filename, filehash, texthash)
+        if metrics is not None:
+            metrics.observe("parse", perf_counter() - start)
+            metrics.document("unknown" if parsed is None else parsed["Type"])
+
+        if parsed is None:
+            doclog.info("unknown document type: %s", _file)
+            return
+
+        self.collect(parsed, source=_file)
+
+    def clear(self) -> None:
+        """Remove the parsed data, e.g. after saving a batch."""
+        for attribute in self.resultDict.values():
+            getattr(self, attribute).clear()
+        self.parsedfiles = []
+        self.sources = {collection: [] for collection in self.resultDict}
+        self.duplicates = []
+        self.failed = []
+        self.fxrates = FXRateStore(self.fxrates.base)
+        # fingerprints of a batch that was not saved
+        if self.dedup is not None:
+            self.dedup.discard()
+
+    def parse_document(self, filename: str, rawText: str) -> dict:
+        """Classify and parse the raw text of a single document.
 
-            elif _doctype == "divertrags":
-                parsed = {**parsed, **self.parse_divertrags(rawText, accountDict)}
-                self.divparsed.append(parsed)
+        Args:
+            filename (str): name of the pdf file
+            rawText (str): raw pdf text
+
+        Returns:
+            dict: parsed data, None if the document type is not known
+        """
+        if self.profiler is not None:
+            with self.profiler.document(filename, rawText):
+                return self._parse_document(filename, rawText)
 
-            elif _doctype == "tax":
-                parsed = {**parsed, **self.parse_tax(rawText)}
-                self.taxparsed.append(parsed)
+        return self._parse_document(filename, rawText)
 
-            elif _doctype in ["buy", "sell"]:
-                parsed = {**parsed, **self.parse_buysell(rawText, _doctype)}
-                self.buysellparsed.append(parsed)
+    def _parse_document(self, filename: str, rawText: str) -> dict:
+        # return dict
+        parsed = {"filename": filename}
 
-            elif _doctype == "finanzreport":
-                parsed = {**parsed, **self.parse_finanzreport(rawText)}
-                saldos = parsed["saldos"].to_dict(orient="records")
-                transactions = parsed["giroTransactions"].to_dict(orient="records")
+        _doctype = self.classify(rawText)
+        if _doctype is None:
+            return None
+        parsed = {**parsed, **{"Type": _doctype}}
+        doclog.debug("%s: %s", filename, _doctype)
 
-                for s in saldos:
-                    self.saldos.append(s)
+        if _doctype not in ["finanzreport"]:
+            accountDict = self.parse_account(rawText, _doctype)
+            parsed = {**parsed, **accountDict}
 
-                for t in transactions:
-                    self.girotransactions.append(t)
+        if _doctype == "div":
+            parsed = {**parsed, **self.parse_div(rawText, accountDict)}
 
-        return (
-            self.divparsed,
-            self.buysellparsed,
-            self.taxparsed,
-            self.saldos,
-            self.girotransactions,
-        )
+        elif _doctype == "divertrags":
+            parsed = {**parsed, **self.parse_divertrags(rawText, accountDict)}
+
+        elif _doctype == "tax":
+            parsed = {**parsed, **self.parse_tax(rawText)}
+
+        elif _doctype in ["buy", "sell"]:
+            parsed = {**parsed, **self.parse_buysell(rawText, _doctype)}
+
+        elif _doctype == "finanzreport":
+            parsed = {**parsed, **self.parse_finanzreport(rawText)}
+
+        return parsed
+
+    def classify(self, rawText: str) -> str:
+        """Document type of a raw text.
+
+        Args:
+            rawText (str): raw pdf text
+
+        Returns:
+            str: document type, None if not known
+        """
+        docutypere = "(" + ("|").join(self.docuDict.keys()) + ")"
+        docutype = self._findall(f"{docutypere}", rawText)
+
+        if docutype:
+            return self.docuDict[docutype[0]]
+        return None
+
+    def frames(self, parsed: dict) -> Dict[str, pd.DataFrame]:
+        """Get the finanzreport tables of a parsed document, per collection.
+
+        Args:
+            parsed (dict): output of parse_document for a finanzreport
+
+        Returns:
+            Dict[str, pd.DataFrame]: collection name - table
+        """
+        giro = parsed["giroTransactions"].assign(filename=parsed["filename"])
+        if self.categorizer is not None:
+            giro["category"] = self.categorizer.categorizeFrame(giro)
+
+        return {
+            "saldos": parsed["saldos"].assign(filename=parsed["filename"]),
+            "giroTransactions": giro,
+        }
+
+    def records(self, parsed: dict) -> Dict[str, List[Dict]]:
+        """Split a parsed document into the documents that are stored, per collection.
+
+        Args:
+            parsed (dict): output of parse_document
+
+        Returns:
+            Dict[str, List[Dict]]: collection name - list of documents
+        """
+        if parsed["Type"] == "finanzreport":
+            return {
+                collection: [toDocument(r) for r in df.to_dict(orient="records")]
+                for collection, df in self.frames(parsed).items()
+            }
+
+        return {self.collectionDict[parsed["Type"]]: [toDocument(parsed)]}
+
+    def collect(self, parsed: dict, source: str = None) -> None:
+        """Add the records of a parsed document to the in-memory results.
+
+        Args:
+            parsed (dict): output of parse_document
+            source (str, optional): path of the parsed file. Defaults to the filename.
+        """
+        source = parsed["filename"] if source is None else source
+        if parsed["Type"] == "finanzreport":
+            for collection, df in self.frames(parsed).items():
+                getattr(self, self.resultDict[collection]).extend(df)
+                self.sources[collection].extend([source] * len(df))
+        else:
+            collection = self.collectionDict[parsed["Type"]]
+            getattr(self, self.resultDict[collection]).append(parsed)
+            self.sources[collection].append(source)
+            self.fxrates.collect(parsed)
+
+    def readText(self, _file: str) -> str:
+        """Get the raw text of a pdf file. If a text store is attached, previously
+        extracted text is read from the store and newly extracted text is added to it.
+
+        The store is keyed by filename. A file with the same name as a stored file
+        from another folder is extracted, but not stored, the store keeps the text
+        of the first file.
+
+        Args:
+            _file (str): PDF file
+
+        Returns:
+            str: raw pdf text
+        """
+        key = _file.split("/")[-1]
+        source = os.path.abspath(_file)
+
+        if self.textstore is not None and key in self.textstore:
+            if self.textstore.source(key) in (None, source):
+                return self.textstore.get(key)
+            doclog.warning("%s: text store holds %s, not stored", _file, self.textstore.source(key))
+            return self.extract(_file)
+
+        rawText = self.extract(_file)
+
+        if self.textstore is not None:
+            self.textstore.append(key, rawText, source)
+
+        return rawText
+
+    def extract(self, _file: str) -> str:
+        """Extract the raw text of a pdf file with tika.
+
+        Only the first headPages pages are extracted, enough to classify the
+        document and to parse all types but those in fullTextTypes. The full
+        text is extracted for these types, for documents that can not be
+        classified from the first pages and when pypdf is not installed.
+
+        Args:
+            _file (str): PDF file
+
+        Returns:
+            str: raw pdf text
+        """
+        if self.headPages is not None:
+            try:
+                raw, pages = readPages(_file, 0, self.headPages)
+            except (ImportError, ValueError) as e:
+                doclog.debug("page extraction not possible for %s: %s", _file, e)
+            else:
+                head = raw["content"] or ""
+                if pages <= self.headPages:
+                    return head
+                docutype = self.classify(head)
+                if docutype is not None and docutype not in self.fullTextTypes:
+                    return head
+
+        return readRaw(_file)["content"] or ""
 
     def parse_account(self, rawText: str, _doctype: str) -> dict:
         """Extract account and account currency data, date of transaction and total amount. Total amount
@@ -175,7 +485,7 @@ class ComDirectParser:
         datere = r"([0-9]+\.[0-9]+\.[0-9]+) \s+"
         totalcostre = rf" {self.CUR} \s+([0-9]*[.]*[0-9]*[,][0-9]*)"
 
-        accountDateCost = re.findall(accountre + datere + totalcostre, rawText)
+        accountDateCost = self._findall(accountre + datere + totalcostre, rawText)
 
         if accountDateCost:
             if _doctype == "div":
@@ -205,7 +515,7 @@ class ComDirectParser:
 
             account, accountCurr, date, totalCostCurr, totalCost = accountDateCost[0]
 
-            date = date.replace(".", "-")
+            date = stringToDate(date)
             totalCost = stringToNumber(totalCost)
 
             _accountDateCostValues = [account, accountCurr, date, totalCostCurr, totalCost]
@@ -228,7 +538,7 @@ class ComDirectParser:
         stocknamere = r"(?:\s[\w\.]*)+?(?=[ ]{2,})\s+"
         sharesre = r"(\S+)"
         isinre = r"\s+(\S+)"
-        wknNameIsin = re.findall(isinliteralre + wknre + stocknamere + sharesre + isinre, rawText)
+        wknNameIsin = self._findall(isinliteralre + wknre + stocknamere + sharesre + isinre, rawText)
 
         if wknNameIsin:
             _wknNameIsinKeys = ["wkn", "Stock", "Shares", "isin"]
@@ -240,21 +550,21 @@ class ComDirectParser:
             divparsed = {**divparsed, **dict(zip(_wknNameIsinKeys, _wknNameIsinValues))}
 
         # get dividend per stock and dividend currency
-        dividendperstockAndCurr = re.findall(
+        dividendperstockAndCurr = self._findall(
             rf"{self.CUR}\s*(\d+(?:\.\d+)?,\d+).*Stück",
             rawText
             # rf"{self.CUR}\s([0-9]*[.]*[0-9]*[,][0-9]*)\s+Stück", rawText
         )
         divCurr, divperstock = dividendperstockAndCurr[0]
 
-        _, brutto = re.findall(rf"Bruttobetrag:\s+{self.CUR}\s+(\S+)", rawText)[0]
+        _, brutto = self._findall(rf"Bruttobetrag:\s+{self.CUR}\s+(\S+)", rawText)[0]
 
         # convert string numbers to float
         divperstock = stringToNumber(divperstock)
         brutto = stringToNumber(brutto)
 
         # source tax
-        sourcetax = re.findall(
+        sourcetax = self._findall(
             rf"(\d+(?:\.\d+)?,\d+) % Quellensteuer\s+{self.CUR}\s+{regexdecimal}", rawText
         )
         tax_percentage, tax_curr, tax = sourcetax[0]
@@ -266,7 +576,7 @@ class ComDirectParser:
         # if dividend currency is not equal to account currency
         if divCurr != accountCurr:
             forexrate = stringToNumber(
-                re.findall(r"Devisenkurs:\s+\S+\s+([0-9]*[.]*[0-9]*,[0-9]*)", rawText)[0]
+                self._findall(r"Devisenkurs:\s+\S+\s+([0-9]*[.]*[0-9]*,[0-9]*)", rawText)[0]
             )
         else:
             forexrate = 1.0
@@ -276,13 +586,13 @@ class ComDirectParser:
         tax = np.round(tax / forexrate, 2)
         cost = np.round(brutto - totalCost, 2)
 
-        _costKeys = ["Dividend (per share)", "Brutto", "Fees"]
-        _costValues = [div, brutto, cost]
+        _costKeys = ["Dividend (per share)", "Brutto", "Fees", "Dividend Curr", "FX Rate"]
+        _costValues = [div, brutto, cost, divCurr, forexrate]
 
         divparsed = {**divparsed, **dict(zip(_costKeys, _costValues))}
 
         # get reference number to match with Tax document
-        refnr = re.findall(rf"Referenz\S+\s+(\S+)\)", rawText)[0]
+        refnr = self._findall(rf"Referenz\S+\s+(\S+)\)", rawText)[0]
 
         divparsed = {**divparsed, **{"Tax Reference Number": refnr}}
 
@@ -303,7 +613,7 @@ class ComDirectParser:
         stocknamere = r"(?:\s[\w\.]*)+?(?=[ ]{2,})\s+"
         sharesre = r"(\S+)"
         isinre = r"\s+(\S+)"
-        wknNameIsin = re.findall(isinliteralre + wknre + stocknamere + sharesre + isinre, rawText)
+        wknNameIsin = self._findall(isinliteralre + wknre + stocknamere + sharesre + isinre, rawText)
 
         if wknNameIsin:
             _wknNameIsinKeys = ["wkn", "Stock", "Shares", "isin"]
@@ -315,11 +625,11 @@ class ComDirectParser:
             divparsed = {**divparsed, **dict(zip(_wknNameIsinKeys, _wknNameIsinValues))}
 
         # get dividend and dividend currency
-        dividendAndCurr = re.findall(
+        dividendAndCurr = self._findall(
             rf"{self.CUR}\s([0-9]*[.]*[0-9]*[,][0-9]*)\s+Dividende pro Stück", rawText
         )
         divCurr, div = dividendAndCurr[0]
-        _, brutto = re.findall(rf"Bruttobetrag:\s+{self.CUR}\s+(\S+)", rawText)[0]
+        _, brutto = self._findall(rf"Bruttobetrag:\s+{self.CUR}\s+(\S+)", rawText)[0]
 
         # convert string numbers to float
         div = stringToNumber(div)
@@ -328,7 +638,7 @@ class ComDirectParser:
         # if dividend currency is not equal to account currency
         if divCurr != accountCurr:
             forexrate = stringToNumber(
-                re.findall(r"Devisenkurs:\s+\S+\s+([0-9]*[.]*[0-9]*,[0-9]*)", rawText)[0]
+                self._findall(r"Devisenkurs:\s+\S+\s+([0-9]*[.]*[0-9]*,[0-9]*)", rawText)[0]
             )
         else:
             forexrate = 1.0
@@ -337,13 +647,13 @@ class ComDirectParser:
         brutto = np.round(brutto / forexrate, 2)
         cost = np.round(brutto - totalCost, 2)
 
-        _costKeys = ["Dividend (per share)", "Brutto", "Fees"]
-        _costValues = [div, brutto, cost]
+        _costKeys = ["Dividend (per share)", "Brutto", "Fees", "Dividend Curr", "FX Rate"]
+        _costValues = [div, brutto, cost, divCurr, forexrate]
 
         divparsed = {**divparsed, **dict(zip(_costKeys, _costValues))}
 
         # get reference number to match with Tax document
-        refnr = re.findall(rf"Referenz\S+\s+(\S+)\)", rawText)[0]
+        refnr = self._findall(rf"Referenz\S+\s+(\S+)\)", rawText)[0]
 
         divparsed = {**divparsed, **{"Tax Reference Number": refnr}}
 
@@ -360,7 +670,7 @@ class ComDirectParser:
         isinliteralre = r"WPKNR/ISIN\s+\n"
         stocknamewknre = r"(\S+(?:\s[a-zA-Z0-9äöüÄÖÜß\.\-\&]+)+?)(?=[ ]{2,})\s+(\S+)\s+\n"
         stocktypeisinre = r"(\S+(?:\s[\w\.\-\,]*)+?)(?=[ ]{2,})\s+(\S+)"
-        nameWknTypeIsin = re.findall(isinliteralre + stocknamewknre + stocktypeisinre, rawText)
+        nameWknTypeIsin = self._findall(isinliteralre + stocknamewknre + stocktypeisinre, rawText)
 
         if nameWknTypeIsin:
             _stockWknTypeIsinKeys = ["Stock", "wkn", "stock Type", "isin"]
@@ -369,7 +679,7 @@ class ComDirectParser:
 
             parsed = {**parsed, **dict(zip(_stockWknTypeIsinKeys, _stockWknTypeIsinValues))}
 
-        stk, pricecurr, pricepershare = re.findall(
+        stk, pricecurr, pricepershare = self._findall(
             rf"[St\.|Stk]\s+(\S+) \s+ {self.CUR}\s* ([0-9]*[.]*[0-9]*[,][0-9]*)", rawText
         )[0]
 
@@ -377,7 +687,7 @@ class ComDirectParser:
         pricepershare = stringToNumber(pricepershare)
 
         try:
-            _, _, provision = re.findall(
+            _, _, provision = self._findall(
                 rf"\n[ ]*(Provision(?:\s[\S+\.]*)+?)[ ]:[ ]{self.CUR}[ ]*([0-9]*[.]*[0-9]*[,][0-9]*)",
                 rawText,
             )[0]
@@ -385,7 +695,7 @@ class ComDirectParser:
             provision = np.nan
 
         try:
-            _, _, entgelt = re.findall(
+            _, _, entgelt = self._findall(
                 rf"\n[ ]*(Summe Entgelte(?:\s[\S+\.]*)+?)[ ]:[ ]{self.CUR}[ ]*([0-9]*[.]*[0-9]*[,][0-9]*)",
                 rawText,
             )[0]
@@ -393,7 +703,7 @@ class ComDirectParser:
             entgelt = np.nan
 
         try:
-            _, _, maklercourtage = re.findall(
+            _, _, maklercourtage = self._findall(
                 rf"\n[ ]*(Maklercourtage(?:\s[\S+\.]*)+?)[ ]:[ ]{self.CUR}[ ]*([0-9]*[.]*[0-9]*[,][0-9]*)",
                 rawText,
             )[0]
@@ -401,7 +711,7 @@ class ComDirectParser:
             maklercourtage = np.nan
 
         try:
-            _, _, umschreibe = re.findall(
+            _, _, umschreibe = self._findall(
                 rf"\n[ ]*(Umschreibeentgelt(?:\s[\S+\.]*)+?)[ ]:[ ]{self.CUR}[ ]*([0-9]*[.]*[0-9]*[,][0-9]*)",
                 rawText,
             )[0]
@@ -409,7 +719,7 @@ class ComDirectParser:
             umschreibe = np.nan
 
         try:
-            _, _, varexchange = re.findall(
+            _, _, varexchange = self._findall(
                 rf"\n[ ]*(Variable Börsenspesen(?:\s[\S+\.]*)+?)[ ]:[ ]{self.CUR}[ ]*([0-9]*[.]*[0-9]*[,][0-9]*)",
                 rawText,
             )[0]
@@ -417,7 +727,7 @@ class ComDirectParser:
             varexchange = np.nan
 
         try:
-            _, _, netto, = re.findall(
+            _, _, netto, = self._findall(
                 rf"\n[ ]*(Zu Ihren Gunsten nach Steuern:)[ ]*{self.CUR}[ ]*([0-9]*[.]*[0-9]*[,][0-9]*)",
                 rawText,
             )[0]
@@ -449,7 +759,7 @@ class ComDirectParser:
         parsed = {**parsed, **dict(zip(_priceKeys, _priceVals))}
 
         # get Exchange name
-        boerse = re.findall(f"Ausführungsplatz\s+:\s+(.*)", rawText)[0]
+        boerse = self._findall(f"Ausführungsplatz\s+:\s+(.*)", rawText)[0]
         parsed = {**parsed, **{"Exchange": boerse.strip()}}
 
         return parsed
@@ -465,7 +775,7 @@ class ComDirectParser:
         """
         parsed = {}
         # Get Tax Type
-        taxtype = re.findall(f"\nSteuerliche Behandlung:\s+(.*)", rawText)[0]
+        taxtype = self._findall(f"\nSteuerliche Behandlung:\s+(.*)", rawText)[0]
 
         if "Dividende" in taxtype:
             taxtype = "div"
@@ -475,8 +785,8 @@ class ComDirectParser:
             taxtype = "unknown"
 
         # get reference number to match with Tax document
-        refnr = re.findall(rf"Referenz\S+\s+(\S+)", rawText)[0]
-        values = re.findall(
+        refnr = self._findall(rf"Referenz\S+\s+(\S+)", rawText)[0]
+        values = self._findall(
             rf"\nZu Ihren \w+\s+\S+\s+\S+\s+{self.CUR}\s* ([-]?[0-9]*[.]*[0-9]*[,][0-9]*)", rawText
         )
         tax_currency = values[0][0]
@@ -508,24 +818,24 @@ class ComDirectParser:
 
         kontooverview = [
             s
-            for s in re.findall("Kontoübersicht\n\n(.*)Gesamtsaldo", rawText, re.DOTALL)[0].split(
+            for s in self._findall("Kontoübersicht\n\n(.*)Gesamtsaldo", rawText, re.DOTALL)[0].split(
                 "\n"
             )
             if s
         ]
 
-        date = re.findall("per " + datere, rawText)[0].replace(".", "-")
+        date = self._findall("per " + datere, rawText)[0].replace(".", "-")
         currency = kontooverview[1]
         kontooverview = kontooverview[2:]
-        kontoslist = re.findall(overviewre, "\n".join(kontooverview))
-        girodetail = re.findall("Girokonto[\S\s]*?Alter([\S\s]*?)(?=Neuer)", rawText)[0]
-        girotransactions = re.findall(
+        kontoslist = self._findall(overviewre, "\n".join(kontooverview))
+        girodetail = self._findall("Girokonto[\S\s]*?Alter([\S\s]*?)(?=Neuer)", rawText)[0]
+        girotransactions = self._findall(
             datere + datere + "([\S\s]+?)\n\W([\S\s]+?)\n\W" + valuere, girodetail
         )
 
         # ACCOUNTS SALDO OVERVIEW (END OF MONTH)
         df = pd.DataFrame(kontoslist, columns=["name", "account", "saldo"])
-        df.loc[:, "saldo"] = df["saldo"].apply(stringToNumber)
+        df["saldo"] = parseNumbers(df["saldo"])
         df.loc[:, "date"] = date
         df["date"] = pd.to_datetime(df["date"], dayfirst=True)
 
@@ -533,7 +843,7 @@ class ComDirectParser:
         dfgiro = pd.DataFrame(
             girotransactions, columns=["date", "ValDate", "type", "details", "value"]
         )
-        dfgiro.loc[:, "value"] = dfgiro["value"].apply(stringToNumber)
+        dfgiro["value"] = parseNumbers(dfgiro["value"])
         dfgiro.loc[:, "date"] = pd.to_datetime(dfgiro["date"], dayfirst=True)
         dfgiro.loc[:, "ValDate"] = pd.to_datetime(dfgiro["ValDate"], dayfirst=True)
 
@@ -543,6 +853,17 @@ class ComDirectParser:
 
         return parsed
 
+    def ensureIndexes(self, db_name: str = "ComDirect") -> None:
+        """Create the indexes of all collections.
+
+        Args:
+            db_name (str, optional): name of the database. Defaults to "ComDirect".
+        """
+        for collection, indexes in self.indexDict.items():
+            col = self.client[db_name][collection]
+            for keys, unique in indexes:
+                col.create_index(keys, unique=unique)
+
     def save(self, db_name: str = "ComDirect"):
         """Save the data to mongodb
 
@@ -556,40 +877,314 @@ class ComDirectParser:
         colsaldos = self.client[db_name]["saldos"]
         colgirotransactions = self.client[db_name]["giroTransactions"]
 
-        # colm.create_index(indexTupleList, unique=unique)
-        coldiv.create_index(
-            [("Date", ASCENDING), ("Tax Reference Number", ASCENDING), ("filename", ASCENDING)],
-            unique=True,
-        )
-        coltax.create_index(
-            [("Date", ASCENDING), ("Tax Reference Number", ASCENDING), ("filename", ASCENDING)],
-            unique=True,
-        )
-        colbus.create_index(
-            [("Date", ASCENDING), ("Tax Reference Number", ASCENDING), ("filename", ASCENDING)],
-            unique=True,
-        )
-        colsaldos.create_index(
-            [("date", ASCENDING), ("name", ASCENDING)],
-            unique=True,
-        )
-        colgirotransactions.create_index(
-            [("date", ASCENDING), ("type", ASCENDING)],
-            unique=True,
-        )
+        self.ensureIndexes(db_name)
 
         try:
             if self.divparsed:
-                coldiv.insert_many(self.divparsed, ordered=False)
+                self._insert(coldiv, self.divparsed.toDocuments())
             if self.taxparsed:
-                coltax.insert_many(self.taxparsed, ordered=False)
+                self._insert(coltax, self.taxparsed.toDocuments())
             if self.buysellparsed:
-                colbus.insert_many(self.buysellparsed, ordered=False)
+                self._insert(colbus, self.buysellparsed.toDocuments())
             if self.saldos:
-                colsaldos.insert_many(self.saldos, ordered=False)
+                self._insert(colsaldos, self.saldos.toDocuments())
             if self.girotransactions:
-                colgirotransactions.insert_many(self.girotransactions, ordered=False)
+                self._insert(colgirotransactions, self.girotransactions.toDocuments())
 
         except BulkWriteError as e:
             print(e)
             pass
+
+        self.saveParserVersions(db_name, self.parsedfiles)
+        self.fxrates.save(self.client[db_name]["fxrates"])
+
+        if self.dedup is not None:
+            self.dedup.flush()
+
+    def _insert(self, col, documents: List[Dict]) -> None:
+        """insert_many, counting the inserted documents in the metrics."""
+        inserted = 0
+        try:
+            result = col.insert_many(documents, ordered=False)
+            inserted = len(result.inserted_ids)
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.write(col.name, inserted)
+
+    def ingest(
+        self,
+        db_name: str = "ComDirect",
+        checkpointEvery: int = 100,
+        filelist: List[str] = None,
+        retryFailed: bool = False,
+    ) -> Dict[str, int]:
+        """Parse and save the files with a checkpoint every checkpointEvery files, for long
+        running ingests. A restarted ingest resumes after the last checkpoint, see checkpoint().
+        Files that can not be parsed are recorded with their error and skipped.
+
+        Args:
+            db_name (str, optional): name of the database. Defaults to "ComDirect".
+            checkpointEvery (int, optional): files per checkpoint. Defaults to 100.
+            filelist (List[str], optional): files to ingest instead of the discovered ones. Defaults to None.
+            retryFailed (bool, optional): try the files that failed before again. Defaults to False.
+
+        Returns:
+            Dict[str, int]: number of files skipped as completed before, ingested and failed now
+        """
+        filelist = self.filelist if filelist is None else filelist
+        completed = self.completedFiles(db_name, includeFailed=not retryFailed)
+        todo = [_file for _file in filelist if _file not in completed]
+        if completed:
+            doclog.info("resuming ingest, %d of %d files completed", len(filelist) - len(todo), len(filelist))
+
+        failed = 0
+        for i in range(0, len(todo), checkpointEvery):
+            chunk = todo[i : i + checkpointEvery]
+            self.parse(chunk, skipErrors=True)
+            failed += len(self.failed)
+            self.checkpoint(db_name, chunk)
+            self.clear()
+
+        return {"skipped": len(filelist) - len(todo), "ingested": len(todo) - failed, "failed": failed}
+
+    def completedFiles(self, db_name: str = "ComDirect", includeFailed: bool = True) -> set:
+        """Files completed by previous checkpoints.
+
+        Args:
+            db_name (str, optional): name of the database. Defaults to "ComDirect".
+            includeFailed (bool, optional): include the files that failed to parse. Defaults to True.
+
+        Returns:
+            set: file paths
+        """
+        query = {} if includeFailed else {"failed": None}
+        return {doc["_id"] for doc in self.client[db_name]["ingestCursor"].find(query, {"_id": 1})}
+
+    def checkpoint(self, db_name: str, files: List[str]) -> None:
+        """Durably write the parsed data, then mark the files as completed.
+
+        The records get deterministic ids (file path and position in the file) and are
+        upserted, all writes wait for the journal. When an ingest is killed before the
+        files are marked, the restarted ingest parses them again and replaces the same
+        records, so every record is written exactly once.
+
+        Args:
+            db_name (str): name of the database
+            files (List[str]): files of the parsed data, including those in failed
+        """
+        db = self.client[db_name]
+        durable = WriteConcern(w=1, j=True)
+
+        self.ensureIndexes(db_name)
+
+        for collection, attribute in self.resultDict.items():
+            store = getattr(self, attribute)
+            if store:
+                self._upsert(
+                    db[collection].with_options(write_concern=durable),
+                    store.toDocuments(),
+                    self.sources[collection],
+                )
+
+        self.saveParserVersions(db_name, self.parsedfiles)
+        self.fxrates.save(db["fxrates"].with_options(write_concern=durable))
+        if self.dedup is not None:
+            self.dedup.flush()
+
+        if files:
+            now = datetime.utcnow()
+            errors = dict(self.failed)
+            db["ingestCursor"].with_options(write_concern=durable).bulk_write(
+                [
+                    ReplaceOne({"_id": f}, {"completed": now, "failed": errors.get(f)}, upsert=True)
+                    for f in files
+                ],
+                ordered=False,
+            )
+        doclog.info("checkpoint: %d files completed, %d failed", len(files), len(self.failed))
+
+    def _upsert(self, col, documents: List[Dict], sources: List[str]) -> None:
+        """Replace the documents by their deterministic id, counting them in the metrics."""
+        # position of the record within its file, saldos and transactions have several;
+        # the full path, as files in different folders can have the same name
+        counts = {}
+        ops = []
+        for doc, source in zip(documents, sources):
+            n = counts.get(source, 0)
+            counts[source] = n + 1
+            ops.append(ReplaceOne({"_id": f"{source}#{n}"}, doc, upsert=True))
+
+        written = len(ops)
+        try:
+            col.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # the same record from another file (e.g. overlapping finanzreports)
+            # is skipped by the unique indexes, as in save()
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            written -= len(e.details["writeErrors"])
+            doclog.info("%d records already stored", len(e.details["writeErrors"]))
+
+        if self.metrics is not None:
+            self.metrics.write(col.name, written)
+
+    def saveParserVersions(self, db_name: str, filenames: List[str]) -> None:
+        """Record the current parser version for the given files.
+
+        Args:
+            db_name (str): name of the database
+            filenames (List[str]): parsed files
+        """
+        if not filenames:
+            return
+
+        colversions = self.client[db_name]["parserVersions"]
+        colversions.bulk_write(self.parserVersionUpdates(filenames), ordered=False)
+
+    def parserVersionUpdates(self, filenames: List[str]) -> List[UpdateOne]:
+        """Bulk operations recording the current parser version for the given files.
+
+        Args:
+            filenames (List[str]): parsed files
+
+        Returns:
+            List[UpdateOne]: upserts for the parserVersions collection
+        """
+        return [
+            UpdateOne({"_id": f}, {"$set": {"version": self.PARSER_VERSION}}, upsert=True)
+            for f in filenames
+        ]
+
+    def reparse(
+        self, textstore: TextStore = None, db_name: str = "ComDirect", force: bool = False
+    ) -> Dict[str, int]:
+        """Re-run only the parsing stage over previously extracted text and update the
+        stored documents whose parsed output changed. Files already parsed with the
+        current PARSER_VERSION are skipped, unless force is set. Without a categorizer the
+        stored categories of the giro transactions are not compared.
+
+        Args:
+            textstore (TextStore, optional): store with the extracted text. Defaults to the attached one.
+            db_name (str, optional): name of the database. Defaults to "ComDirect".
+            force (bool, optional): also reparse files at the current version. Defaults to False.
+
+        Returns:
+            Dict[str, int]: number of files per outcome
+                (skipped, unchanged, updated, inserted, unknown, failed)
+        """
+        textstore = textstore if textstore is not None else self.textstore
+        db = self.client[db_name]
+        colversions = db["parserVersions"]
+
+        self.ensureIndexes(db_name)
+
+        versions = {d["_id"]: d.get("version") for d in colversions.find({}, {"version": 1})}
+        stats = {"skipped": 0, "unchanged": 0, "updated": 0, "inserted": 0, "unknown": 0, "failed": 0}
+        done = []
+
+        for filename, rawText in tqdm(textstore.items(), total=len(textstore)):
+            if not force and versions.get(filename) == self.PARSER_VERSION:
+                stats["skipped"] += 1
+                continue
+
+            try:
+                parsed = self.parse_document(filename, rawText)
+            except Exception:
+                # the version is not saved, the file is tried again by the next reparse
+                doclog.exception("failed to reparse %s", filename)
+                stats["failed"] += 1
+                continue
+            done.append(filename)
+
+            if parsed is None:
+                stats["unknown"] += 1
+                continue
+
+            self.fxrates.collect(parsed)
+
+            outcomes = [
+                self._replaceRecords(db[collection], filename, records, collection)
+                for collection, records in self.records(parsed).items()
+            ]
+
+            if "inserted" in outcomes:
+                stats["inserted"] += 1
+            elif "updated" in outcomes:
+                stats["updated"] += 1
+            else:
+                stats["unchanged"] += 1
+
+        self.saveParserVersions(db_name, done)
+        self.fxrates.save(db["fxrates"])
+
+        return stats
+
+    def _replaceRecords(self, col, filename: str, records: List[Dict], collection: str) -> str:
+        """Bring the stored records of one file in line with the newly parsed ones.
+
+        Args:
+            col (Collection): mongo collection
+            filename (str): name of the pdf file
+            records (List[Dict]): newly parsed records
+            collection (str): name of the collection
+
+        Returns:
+            str: inserted, updated or unchanged
+        """
+        existing = list(col.find({"filename": filename}))
+        # without a categorizer the stored categories are not comparable with the parsed records
+        ignore = ("_id",) if self.categorizer is not None else ("_id", "category")
+
+        if not existing:
+            if records:
+                try:
+                    col.insert_many(records, ordered=False)
+                except BulkWriteError as e:
+                    doclog.warning(
+                        "%s: %d records not inserted", filename, len(e.details.get("writeErrors", []))
+                    )
+            return "inserted"
+
+        if collection not in self.multiRecordCollections:
+            if _sameRecords(existing[:1], records, ignore):
+                return "unchanged"
+            col.replace_one({"_id": existing[0]["_id"]}, records[0])
+            return "updated"
+
+        if _sameRecords(existing, records, ignore):
+            return "unchanged"
+
+        col.delete_many({"filename": filename})
+        if records:
+            try:
+                col.insert_many(records, ordered=False)
+            except BulkWriteError as e:
+                doclog.warning("%s: %d records not inserted", filename, len(e.details.get("writeErrors", [])))
+        return "updated"
+
+
+def _normalizeValue(value):
+    """Make parsed values comparable with the values read back from mongo."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if isinstance(value, datetime):
+        # mongo stores milliseconds and no timezone
+        return value.replace(microsecond=value.microsecond // 1000 * 1000, tzinfo=None)
+    return value
+
+
+def _sameRecords(stored: List[Dict], parsed: List[Dict], ignore: Sequence[str] = ("_id",)) -> bool:
+    """Compare stored mongo documents with newly parsed records, ignoring order and the ignored fields."""
+
+    def _key(record):
+        items = [(k, _normalizeValue(v)) for k, v in record.items() if k not in ignore]
+        return repr(sorted(items, key=lambda kv: kv[0]))
+
+    return sorted(map(_key, stored)) == sorted(map(_key, parsed))
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.aio
+=================================================================
+
+A module with an asyncio variant of the ComDirect ingest.
+
+The ingest runs as a pipeline of stages connected by bounded queues::
+
+    discovery -> extraction -> parsing -> mongo writes
+
+Tika extraction runs in a thread pool, parsing and categorization in an
+executor (a process pool can be passed in) and the writes go through an async
+mongo client such as ``motor.motor_asyncio.AsyncIOMotorClient``. When the writes fall behind,
+the queues fill up and the earlier stages wait, so memory stays bounded.
+
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from . import ComDirectParser
+from .categorize import Categorizer
+from .metrics import Metrics
+from .textstore import TextStore
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# parser used by the executor workers, created once per process
+_parser = None
+
+
+def _parseDocument(
+    filename: str, rawText: str, categorizer: Categorizer = None
+) -> Tuple[dict, Dict[str, List[Dict]]]:
+    """Parse and categorize a single document in an executor worker.
+
+    Args:
+        filename (str): name of the pdf file
+        rawText (str): raw pdf text
+        categorizer (Categorizer, optional): categorizer of the giro transactions. Defaults to None.
+
+    Returns:
+        Tuple[dict, Dict[str, List[Dict]]]: parsed document (None if unknown) and records per collection
+    """
+    global _parser
+    if _parser is None:
+        _parser = ComDirectParser(inputlist=[], client=None)
+    _parser.categorizer = categorizer
+
+    parsed = _parser.parse_document(filename, rawText)
+    if parsed is None:
+        return None, {}
+    return parsed, _parser.records(parsed)
+
+
+class AsyncComDirectParser:
+    """
+    Asyncio ingest of comdirect pdf files.
+
+    Discovery of the input files is the same as for ComDirectParser, the
+    client must be an async mongo client (motor).
+    """
+
+    def __init__(
+        self,
+        inputlist: list,
+        client,
+        textstore: TextStore = None,
+        executor: Executor = None,
+        extractors: int = 4,
+        parsers: int = 2,
+        queuesize: int = 32,
+        batchsize: int = 100,
+        metrics: Metrics = None,
+        categorizer: Categorizer = None,
+    ) -> None:
+        self.parser = ComDirectParser(inputlist=inputlist, client=None, textstore=textstore)
+        self.client = client
+        self.textstore = textstore
+        self.executor = executor
+        self.extractors = extractors
+        self.parsers = parsers
+        self.queuesize = queuesize
+        self.batchsize = batchsize
+        self.metrics = metrics
+        self.categorizer = categorizer
+
+    @property
+    def filelist(self) -> List[str]:
+        return self.parser.filelist
+
+    async def ensureIndexes(self, db_name: str = "ComDirect") -> None:
+        """Create the indexes of all collections.
+
+        Args:
+            db_name (str, optional): name of the database. Defaults to "ComDirect".
+        """
+        for collection, indexes in ComDirectParser.indexDict.items():
+            col = self.client[db_name][collection]
+            for keys, unique in indexes:
+                await col.create_index(keys, unique=unique)
+
+    async def run(self, db_name: str = "ComDirect") -> Dict[str, int]:
+        """Run the ingest of all input files.
+
+        Args:
+            db_name (str, optional): name of the database to store the data. Defaults to "ComDirect".
+
+        Returns:
+            Dict[str, int]: number of files, unknown and failed files and written records per collection
+        """
+        await self.ensureIndexes(db_name)
+
+        loop = asyncio.get_running_loop()
+        io = ThreadPoolExecutor(max_workers=self.extractors)
+
+        files = asyncio.Queue(maxsize=self.queuesize)
+        texts = asyncio.Queue(maxsize=self.queuesize)
+        records = asyncio.Queue(maxsize=self.queuesize)
+
+        stats = {"files": 0, "unknown": 0, "failed": 0}
+        metrics = self.metrics
+
+        def depths():
+            if metrics is not None:
+                metrics.queue("files", files.qsize())
+                metrics.queue("texts", texts.qsize())
+                metrics.queue("records", records.qsize())
+
+        async def discover():
+            for _file in self.filelist:
+                await files.put(_file)
+            for _ in range(self.extractors):
+                await files.put(_STOP)
+
+        async def extract():
+            while True:
+                _file = await files.get()
+                if _file is _STOP:
+                    return
+                filename = _file.split("/")[-1]
+                start = perf_counter()
+                source = os.path.abspath(_file)
+                try:
+                    # same rules as ComDirectParser.readText
+                    if self.textstore is not None and filename in self.textstore:
+                        if self.textstore.source(filename) in (None, source):
+                            rawText = self.textstore.get(filename)
+                        else:
+                            logger.warning("%s: text store holds another file of the same name", _file)
+                            rawText = await loop.run_in_executor(io, self.parser.extract, _file)
+                    else:
+                        rawText = await loop.run_in_executor(io, self.parser.extract, _file)
+                        if self.textstore is not None:
+                            self.textstore.append(filename, rawText, source)
+                except Exception:
+                    logger.exception("failed to extract %s", _file)
+                    stats["files"] += 1
+                    stats["failed"] += 1
+                    if metrics is not None:
+                        metrics.document("failed")
+                    continue
+                if metrics is not None:
+                    metrics.observe("extract", perf_counter() - start)
+                await texts.put((filename, rawText))
+                depths()
+
+        async def parse():
+            while True:
+                item = await texts.get()
+                if item is _STOP:
+                    return
+                start = perf_counter()
+                stats["files"] += 1
+                try:
+                    parsed, recs = await loop.run_in_executor(
+                        self.executor, _parseDocument, *item, self.categorizer
+                    )
+                except Exception:
+                    # the other documents are still ingested
+                    logger.exception("failed to parse %s", item[0])
+                    stats["failed"] += 1
+                    if metrics is not None:
+                        metrics.document("failed")
+                    continue
+                if parsed is None:
+                    stats["unknown"] += 1
+                if metrics is not None:
+                    metrics.observe("parse", perf_counter() - start)
+                    metrics.document("unknown" if parsed is None else parsed["Type"])
+                await records.put((item[0], recs))
+                depths()
+
+        async def write():
+            pending: Dict[str, List[Dict]] = {}
+            done = []
+            try:
+                while True:
+                    item = await records.get()
+                    if item is _STOP:
+                        break
+                    filename, recs = item
+                    done.append(filename)
+                    for collection, _records in recs.items():
+                        pending.setdefault(collection, []).extend(_records)
+                        if len(pending[collection]) >= self.batchsize:
+                            await self._insert(db_name, collection, pending.pop(collection), stats)
+                    if len(done) >= self.batchsize:
+                        await self._saveParserVersions(db_name, done)
+                        done = []
+            finally:
+                # also when another stage failed, the records parsed so far are kept
+                for collection, _records in pending.items():
+                    await self._insert(db_name, collection, _records, stats)
+                await self._saveParserVersions(db_name, done)
+
+        async def stages():
+            await asyncio.gather(discover(), *[extract() for _ in range(self.extractors)])
+            for _ in range(self.parsers):
+                await texts.put(_STOP)
+
+        async def parsing():
+            await asyncio.gather(*[parse() for _ in range(self.parsers)])
+            await records.put(_STOP)
+
+        tasks = [
+            asyncio.ensure_future(stages()),
+            asyncio.ensure_future(parsing()),
+            asyncio.ensure_future(write()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # let write() flush its pending records
+            await asyncio.gather(*tasks, return_exceptions=True)
+            io.shutdown(wait=False)
+
+        return stats
+
+    async def _insert(self, db_name: str, collection: str, records: List[Dict], stats: dict) -> None:
+        """Insert a batch of records, duplicates are skipped as in ComDirectParser.save."""
+        if not records:
+            return
+        try:
+            result = await self.client[db_name][collection].insert_many(records, ordered=False)
+            inserted = len(result.inserted_ids)
+        except BulkWriteError as e:
+            logger.warning("%s: %d records not inserted", collection, len(e.details.get("writeErrors", [])))
+            inserted = e.details.get("nInserted", 0)
+        stats[collection] = stats.get(collection, 0) + inserted
+        if self.metrics is not None:
+            self.metrics.write(collection, inserted)
+
+    async def _saveParserVersions(self, db_name: str, filenames: List[str]) -> None:
+        if filenames:
+            await self.client[db_name]["parserVersions"].bulk_write(
+                self.parser.parserVersionUpdates(filenames), ordered=False
+            )
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.categorize
+=================================================================
+
+A module to assign categories to the giro transactions of the finanzreports.
+
+The rules are regular expressions (as used with ``str.contains``) per
+category, in priority order: the first matching rule determines the
+category. Instead of one pass per rule, all rules are matched at once with
+an Aho-Corasick automaton, whose matching time does not grow with the number
+of rules. Literal rules (no regular expression syntax, the usual payee names)
+are matched by the automaton directly. For the other rules the automaton
+searches the literal text every match of the rule must contain (e.g.
+``Karten`` for ``Karten(verfügung|zahlung)``), and only the rules whose
+literal was found are evaluated. Results are cached per unique text, the
+same payee or transaction type is only matched once.
+
+When a Categorizer is passed to ComDirectParser, the giro transactions get a
+``category`` column during ingestion::
+
+    categorizer = Categorizer({"groceries": ["REWE", "EDEKA"], "dividends": ["Kupon"]})
+    cdp = ComDirectParser(inputlist=[...], client=client, categorizer=categorizer)
+
+"""
+import json
+import re
+from collections import deque
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, Union
+
+import pandas as pd
+
+try:
+    from re import _parser as _reParser
+except ImportError:  # pragma: no cover, python < 3.11
+    import sre_parse as _reParser
+
+Rules = Union[Dict[str, Sequence[str]], Sequence[Tuple[str, str]]]
+
+_regexSyntax = frozenset(".^$*+?{}[]\\|()")
+
+
+def _requiredLiterals(parsed, ignorecase: bool = False) -> Optional[List[str]]:
+    """Literals of which every match of a parsed pattern contains at least one.
+
+    Args:
+        parsed: pattern parsed by the re parser, a sequence of (op, argument)
+        ignorecase (bool, optional): the literals are compared case insensitive. Defaults to False.
+
+    Returns:
+        Optional[List[str]]: literals, None if no literal is required
+    """
+    candidates = []
+    run = []
+    for op, av in list(parsed) + [(None, None)]:
+        if op is _reParser.LITERAL:
+            run.append(chr(av))
+            continue
+
+        if run:
+            candidates.append(["".join(run)])
+            run = []
+
+        if op is _reParser.SUBPATTERN:
+            if av[1] & re.IGNORECASE and not ignorecase:
+                # (?i:...) within a case sensitive pattern
+                return None
+            literals = _requiredLiterals(av[-1], ignorecase)
+        elif op is _reParser.BRANCH:
+            alternatives = [_requiredLiterals(alternative, ignorecase) for alternative in av[1]]
+            literals = None if None in alternatives else [lit for alt in alternatives for lit in alt]
+        elif op in (_reParser.MAX_REPEAT, _reParser.MIN_REPEAT) and av[0] >= 1:
+            literals = _requiredLiterals(av[2], ignorecase)
+        else:
+            literals = None
+        if literals:
+            candidates.append(literals)
+
+    if not candidates:
+        return None
+    # the most selective: the longest shortest literal
+    return max(candidates, key=lambda literals: min(len(lit) for lit in literals))
+
+
+class _AhoCorasick:
+    """
+    Aho-Corasick automaton reporting the ids of the keywords found in a text.
+    """
+
+    def __init__(self, keywords: Sequence[Tuple[str, int]]) -> None:
+        # node - {character: node}, node - failure link, node - ids of the keywords ending here
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[FrozenSet[int]] = [frozenset()]
+
+        for keyword, _id in keywords:
+            node = 0
+            for ch in keyword:
+                if ch not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(frozenset())
+                    self.goto[node][ch] = len(self.goto) - 1
+                node = self.goto[node][ch]
+            self.out[node] = self.out[node] | {_id}
+
+        # breadth first, so the failure target of a node is complete before the node
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                if node:
+                    f = self.fail[node]
+                    while f and ch not in self.goto[f]:
+                        f = self.fail[f]
+                    self.fail[child] = self.goto[f].get(ch, 0)
+                self.out[child] = self.out[child] | self.out[self.fail[child]]
+
+    def find(self, text: str) -> Set[int]:
+        """Ids of the keywords found in the text."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
+
+class Categorizer:
+    """
+    Rule based categorization of giro transactions.
+    """
+
+    def __init__(
+        self,
+        rules: Rules,
+        default: str = "other",
+        fields: Sequence[str] = ("type", "details"),
+        flags: int = re.IGNORECASE,
+        cachesize: int = 100000,
+    ) -> None:
+        """
+        Args:
+            rules (Rules): category - patterns, or (category, pattern) pairs in priority order
+            default (str, optional): category when no rule matches. Defaults to "other".
+            fields (Sequence[str], optional): transaction fields the rules are matched on.
+                Defaults to ("type", "details").
+            flags (int, optional): regular expression flags. Defaults to re.IGNORECASE.
+            cachesize (int, optional): maximum number of cached texts. Defaults to 100000.
+        """
+        if isinstance(rules, dict):
+            rules = [(category, pattern) for category, patterns in rules.items() for pattern in patterns]
+
+        self.rules: List[Tuple[str, str]] = list(rules)
+        self.default = default
+        self.fields = tuple(fields)
+        self.cachesize = cachesize
+        self._cache: Dict[str, str] = {}
+        self._ignorecase = bool(flags & re.IGNORECASE)
+
+        # keywords of the automaton: (literal, rule index)
+        keywords = []
+        # rule index - compiled pattern of the regular expression rules
+        self.regexes: Dict[int, re.Pattern] = {}
+        # regular expression rules without a required literal, evaluated on every text
+        self._unfiltered: List[int] = []
+        for i, (_, pattern) in enumerate(self.rules):
+            if _regexSyntax.isdisjoint(pattern):
+                keywords.append((pattern, i))
+                continue
+
+            self.regexes[i] = re.compile(pattern, flags)
+            parsed = _reParser.parse(pattern, flags)
+            literals = None
+            if self._ignorecase or not parsed.state.flags & re.IGNORECASE:
+                literals = _requiredLiterals(parsed, self._ignorecase)
+            if literals:
+                keywords.extend((literal, i) for literal in literals)
+            else:
+                self._unfiltered.append(i)
+
+        if self._ignorecase:
+            keywords = [(keyword.lower(), i) for keyword, i in keywords]
+        self.automaton = _AhoCorasick(keywords)
+
+    def __getstate__(self) -> dict:
+        # the cache is not sent along to executor processes
+        return {**self.__dict__, "_cache": {}}
+
+    def _match(self, text: str) -> float:
+        """Index of the first matching rule, inf if none matches."""
+        found = self.automaton.find(text.lower() if self._ignorecase else text)
+        literal = [i for i in found if i not in self.regexes]
+        best = min(literal) if literal else float("inf")
+
+        # the regular expression rules before the best literal rule whose literal was found
+        candidates = sorted(i for i in set(self._unfiltered) | found if i in self.regexes and i < best)
+        for i in candidates:
+            if self.regexes[i].search(text):
+                return i
+        return best
+
+    @classmethod
+    def fromFile(cls, path: str, **kwargs) -> "Categorizer":
+        """Categorizer with the rules of a JSON file, mapping category to a list of patterns.
+
+        Args:
+            path (str): JSON file
+
+        Returns:
+            Categorizer: categorizer
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def categorize(self, text: str) -> str:
+        """Category of a text.
+
+        Args:
+            text (str): text to categorize
+
+        Returns:
+            str: category of the first matching rule, the default if none matches
+        """
+        category = self._cache.get(text)
+        if category is None:
+            rule = self._match(text)
+            category = self.rules[rule][0] if rule != float("inf") else self.default
+
+            if len(self._cache) >= self.cachesize:
+                self._cache.clear()
+            self._cache[text] = category
+        return category
+
+    def _text(self, values) -> str:
+        return "\n".join("" if v is None or v != v else str(v) for v in values)
+
+    def categorizeFrame(self, df: pd.DataFrame) -> pd.Series:
+        """Categories of the transactions in a DataFrame, each unique text is matched once.
+
+        Args:
+            df (pd.DataFrame): transactions with the fields of the rules
+
+        Returns:
+            pd.Series: category per transaction
+        """
+        if df.empty:
+            return pd.Series([], index=df.index, dtype=object)
+
+        texts = [self._text(values) for values in zip(*(df[field] for field in self.fields))]
+        codes, uniques = pd.factorize(pd.Series(texts, index=df.index))
+        categories = [self.categorize(text) for text in uniques]
+        return pd.Series([categories[code] for code in codes], index=df.index, dtype=object)
+
+    def categorizeRecords(self, records: List[Dict]) -> None:
+        """Set the category of transaction records in place.
+
+        Args:
+            records (List[Dict]): transaction records
+        """
+        for record in records:
+            record["category"] = self.categorize(self._text(record.get(field) for field in self.fields))
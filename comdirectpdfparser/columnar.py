@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.columnar
+=================================================================
+
+A module with a columnar accumulator for the parsed records.
+
+Records are buffered per column and turned into typed, numpy backed
+DataFrame chunks every ``chunksize`` records. Whole DataFrames (as produced
+by the finanzreport parser) are added as a chunk without conversion. The
+chunks are concatenated once when the data is requested, and converted to
+mongo documents only at write time.
+
+"""
+from typing import Dict, Iterable, List, Union
+
+import pandas as pd
+
+
+def toDocument(record: dict) -> dict:
+    """Convert a record into a mongo document, dropping missing values (None, NaN, NaT).
+
+    Args:
+        record (dict): parsed record
+
+    Returns:
+        dict: document
+    """
+    return {k: v for k, v in record.items() if not (pd.api.types.is_scalar(v) and pd.isna(v))}
+
+
+class ColumnStore:
+    """
+    Columnar accumulator for records of one type.
+
+    Records may have different keys, missing values are filled with
+    None/NaN in the resulting columns.
+    """
+
+    def __init__(self, chunksize: int = 1024) -> None:
+        self.chunksize = chunksize
+        self._chunks: List[pd.DataFrame] = []
+        self._buffer: Dict[str, list] = {}
+        self._buffered = 0
+
+    def append(self, record: dict) -> None:
+        """Add a single record.
+
+        Args:
+            record (dict): parsed record
+        """
+        for key in record:
+            if key not in self._buffer:
+                self._buffer[key] = [None] * self._buffered
+
+        for key, column in self._buffer.items():
+            column.append(record.get(key))
+
+        self._buffered += 1
+        if self._buffered >= self.chunksize:
+            self._flush()
+
+    def extend(self, records: Union[pd.DataFrame, Iterable[dict]]) -> None:
+        """Add several records, a DataFrame is added as a chunk as is.
+
+        Args:
+            records (Union[pd.DataFrame, Iterable[dict]]): records to add
+        """
+        if isinstance(records, pd.DataFrame):
+            self._flush()
+            if len(records):
+                self._chunks.append(records.reset_index(drop=True))
+            return
+
+        for record in records:
+            self.append(record)
+
+    def _flush(self) -> None:
+        """Turn the buffered records into a typed chunk."""
+        if self._buffered:
+            self._chunks.append(pd.DataFrame(self._buffer))
+            self._buffer = {}
+            self._buffered = 0
+
+    def toDataFrame(self) -> pd.DataFrame:
+        """Get all records as a DataFrame.
+
+        The chunks are concatenated once and kept as a single chunk, so repeated
+        calls return the same frame without copying. Modifying the returned frame
+        modifies the stored data.
+
+        Returns:
+            pd.DataFrame: all records
+        """
+        self._flush()
+
+        if not self._chunks:
+            return pd.DataFrame()
+
+        if len(self._chunks) > 1:
+            self._chunks = [pd.concat(self._chunks, ignore_index=True)]
+
+        return self._chunks[0]
+
+    def toArrow(self):
+        """Get all records as an Arrow table, requires pyarrow.
+
+        Returns:
+            pyarrow.Table: all records
+        """
+        import pyarrow as pa
+
+        return pa.Table.from_pandas(self.toDataFrame(), preserve_index=False)
+
+    def toDocuments(self, start: int = 0) -> List[dict]:
+        """Get the records as mongo documents.
+
+        Args:
+            start (int, optional): index of the first record to convert. Defaults to 0.
+
+        Returns:
+            List[dict]: documents
+        """
+        df = self.toDataFrame()
+        return [toDocument(record) for record in df.iloc[start:].to_dict(orient="records")]
+
+    def clear(self) -> None:
+        """Remove all records."""
+        self._chunks = []
+        self._buffer = {}
+        self._buffered = 0
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self._chunks) + self._buffered
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.dedup
+=================================================================
+
+A module for recognising documents that were already ingested under a
+different filename.
+
+Every document gets two fingerprints: the sha256 of the file content and the
+sha256 of its whitespace normalized extracted text. The file hash is checked
+before extraction, the text hash before parsing. Lookups go through an
+in-memory Bloom filter first, only possible hits are confirmed against the
+persistent index in mongodb.
+
+"""
+import hashlib
+import math
+import re
+from typing import List, Tuple
+
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+_whitespace = re.compile(r"\s+")
+
+
+def fileHash(_file: str) -> str:
+    """sha256 of the file content.
+
+    Args:
+        _file (str): file to hash
+
+    Returns:
+        str: hex digest
+    """
+    h = hashlib.sha256()
+    with open(_file, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def textHash(rawText: str) -> str:
+    """sha256 of the extracted text with all whitespace runs collapsed.
+
+    Args:
+        rawText (str): raw pdf text
+
+    Returns:
+        str: hex digest
+    """
+    normalized = _whitespace.sub(" ", rawText or "").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class BloomFilter:
+    """
+    Bloom filter for strings, sized for a capacity and false positive rate.
+    """
+
+    def __init__(self, capacity: int = 100000, errorrate: float = 0.001) -> None:
+        self.size = max(8, int(math.ceil(-capacity * math.log(errorrate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> List[int]:
+        # double hashing with the two halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class DocumentIndex:
+    """
+    Fingerprints of the ingested documents.
+
+    With a mongo collection the fingerprints are persistent and only the Bloom
+    filter is kept in memory. Without one, exact sets are kept in memory.
+    """
+
+    def __init__(self, collection=None, capacity: int = 100000, errorrate: float = 0.001) -> None:
+        self.collection = collection
+        self.bloom = BloomFilter(capacity, errorrate)
+        # fingerprints not yet written to the collection
+        self.pending: List[dict] = []
+        self._pendingHashes = set()
+        self._hashes = set()
+
+        if collection is not None:
+            collection.create_index([("fileHash", ASCENDING)], unique=True)
+            collection.create_index([("textHash", ASCENDING)])
+            for doc in collection.find({}, {"_id": 0, "fileHash": 1, "textHash": 1}):
+                self.bloom.add(doc["fileHash"])
+                self.bloom.add(doc["textHash"])
+
+    def _known(self, field: str, h: str) -> bool:
+        if h not in self.bloom:
+            return False
+        if h in self._pendingHashes:
+            return True
+        if self.collection is None:
+            return h in self._hashes
+        # possible false positive of the Bloom filter
+        return self.collection.find_one({field: h}, {"_id": 1}) is not None
+
+    def checkFile(self, _file: str) -> Tuple[bool, str]:
+        """Check the file content against the known documents.
+
+        Args:
+            _file (str): pdf file
+
+        Returns:
+            Tuple[bool, str]: duplicate or not, file hash
+        """
+        h = fileHash(_file)
+        return self._known("fileHash", h), h
+
+    def checkText(self, rawText: str) -> Tuple[bool, str]:
+        """Check the extracted text against the known documents.
+
+        Args:
+            rawText (str): raw pdf text
+
+        Returns:
+            Tuple[bool, str]: duplicate or not, text hash
+        """
+        h = textHash(rawText)
+        return self._known("textHash", h), h
+
+    def add(self, filename: str, filehash: str, texthash: str) -> None:
+        """Register the fingerprints of an ingested document.
+
+        Args:
+            filename (str): name of the pdf file
+            filehash (str): file hash
+            texthash (str): text hash
+        """
+        for h in (filehash, texthash):
+            self.bloom.add(h)
+            self._pendingHashes.add(h)
+        self.pending.append({"filename": filename, "fileHash": filehash, "textHash": texthash})
+
+    def discard(self) -> None:
+        """Forget the pending fingerprints, e.g. when their documents were not saved."""
+        self.pending = []
+        self._pendingHashes = set()
+
+    def flush(self) -> None:
+        """Write the pending fingerprints to the collection."""
+        if self.collection is None:
+            self._hashes |= self._pendingHashes
+        elif self.pending:
+            try:
+                self.collection.insert_many(self.pending, ordered=False)
+            except BulkWriteError:
+                # registered concurrently by another ingest
+                pass
+        self.pending = []
+        self._pendingHashes = set()
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.fxrates
+=================================================================
+
+A module with a date indexed store of the exchange rates (Devisenkurs)
+found in the parsed documents.
+
+Rates follow the convention of the documents: the number of units of the
+foreign currency per unit of the account (base) currency, so an amount in
+the foreign currency is converted by dividing by the rate. Lookups use the
+rate of the nearest date, per currency on a sorted date array.
+
+"""
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+from pymongo import ASCENDING, UpdateOne
+
+
+def _day(date) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(date).date(), "D")
+
+
+class FXRateStore:
+    """
+    Exchange rates per currency and date, relative to the base currency.
+    """
+
+    def __init__(self, base: str = "EUR") -> None:
+        self.base = base
+        # currency - {date: rate}
+        self._points: Dict[str, Dict[np.datetime64, float]] = {}
+        # currency - (sorted dates, rates), built on first lookup
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def add(self, currency: str, date: datetime, rate: float) -> None:
+        """Add a rate, a rate for the same currency and date is replaced.
+
+        Args:
+            currency (str): foreign currency
+            date (datetime): date of the rate
+            rate (float): units of currency per unit of the base currency
+        """
+        if currency == self.base:
+            return
+        self._points.setdefault(currency, {})[_day(date)] = float(rate)
+        self._arrays.pop(currency, None)
+
+    def currencies(self) -> list:
+        """Currencies with at least one rate."""
+        return sorted(self._points)
+
+    def _sorted(self, currency: str) -> Tuple[np.ndarray, np.ndarray]:
+        if currency not in self._arrays:
+            points = self._points[currency]
+            dates = np.array(sorted(points), dtype="datetime64[D]")
+            rates = np.array([points[d] for d in dates], dtype=np.float64)
+            self._arrays[currency] = (dates, rates)
+        return self._arrays[currency]
+
+    def rate(self, currency: str, date: datetime) -> float:
+        """Rate of the date nearest to the given date.
+
+        Args:
+            currency (str): foreign currency
+            date (datetime): date
+
+        Returns:
+            float: units of currency per unit of the base currency, NaN if unknown
+        """
+        if currency == self.base:
+            return 1.0
+        if currency not in self._points:
+            return np.nan
+
+        dates, rates = self._sorted(currency)
+        day = _day(date)
+        i = bisect_left(dates, day)
+        if i == len(dates) or (i > 0 and day - dates[i - 1] <= dates[i] - day):
+            i -= 1
+        return rates[i]
+
+    def rates(self, currencies: Iterable[str], dates: Iterable) -> np.ndarray:
+        """Vectorized nearest-date rate lookup.
+
+        Args:
+            currencies (Iterable[str]): currency per value
+            dates (Iterable): date per value
+
+        Returns:
+            np.ndarray: rates, 1 for the base currency and NaN for unknown currencies
+        """
+        currencies = np.asarray(currencies, dtype=object)
+        days = pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]")
+
+        out = np.full(len(currencies), np.nan)
+        out[currencies == self.base] = 1.0
+
+        for currency in set(currencies.tolist()) & set(self._points):
+            mask = currencies == currency
+            sdates, srates = self._sorted(currency)
+            d = days[mask]
+
+            hi = np.clip(np.searchsorted(sdates, d), 0, len(sdates) - 1)
+            lo = np.clip(hi - 1, 0, len(sdates) - 1)
+            nearest = np.where(np.abs(d - sdates[lo]) <= np.abs(sdates[hi] - d), lo, hi)
+            out[mask] = srates[nearest]
+
+        return out
+
+    def convert(self, amounts: Iterable[float], currencies: Iterable[str], dates: Iterable) -> np.ndarray:
+        """Convert amounts into the base currency in one vectorized pass.
+
+        Args:
+            amounts (Iterable[float]): amounts in their own currency
+            currencies (Iterable[str]): currency per amount
+            dates (Iterable): date per amount
+
+        Returns:
+            np.ndarray: amounts in the base currency, NaN for unknown currencies
+        """
+        return np.asarray(amounts, dtype=np.float64) / self.rates(currencies, dates)
+
+    def collect(self, parsed: dict) -> None:
+        """Add the rate of a parsed dividend document, if it has one.
+
+        Args:
+            parsed (dict): output of ComDirectParser.parse_document
+        """
+        currency = parsed.get("Dividend Curr")
+        if (
+            currency is not None
+            and parsed.get("Account curr") == self.base
+            and parsed.get("Date") is not None
+            and parsed.get("FX Rate") is not None
+        ):
+            self.add(currency, parsed["Date"], parsed["FX Rate"])
+
+    def save(self, collection) -> None:
+        """Store all rates in a mongo collection (upserts per base, currency and date).
+
+        Args:
+            collection (Collection): mongo collection
+        """
+        collection.create_index(
+            [("base", ASCENDING), ("currency", ASCENDING), ("date", ASCENDING)], unique=True
+        )
+        ops = [
+            UpdateOne(
+                {"base": self.base, "currency": currency, "date": pd.Timestamp(day).to_pydatetime()},
+                {"$set": {"rate": rate}},
+                upsert=True,
+            )
+            for currency, points in self._points.items()
+            for day, rate in points.items()
+        ]
+        if ops:
+            collection.bulk_write(ops, ordered=False)
+
+    def load(self, collection) -> "FXRateStore":
+        """Add the rates stored in a mongo collection.
+
+        Args:
+            collection (Collection): mongo collection
+
+        Returns:
+            FXRateStore: self
+        """
+        for doc in collection.find({"base": self.base}, {"_id": 0}):
+            self.add(doc["currency"], doc["date"], doc["rate"])
+        return self
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 """
-Module comdirectpdfparser.jlog 
+Module comdirectpdfparser.jlog
 =================================================================
 
 A module
@@ -10,20 +10,50 @@ A module
 import json
 import logging
 
+try:
+    import orjson
+
+    def _dumps(obj: dict) -> str:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+
+
+except ImportError:  # pragma: no cover
+    _dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str).encode
+
+# attributes every LogRecord has, anything else was passed with extra={...}
+_recordAttributes = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
 
 class JSONFormatter(logging.Formatter):
     """Format message as one line of JSON"""
 
+    # LogRecord attributes written to the JSON line
+    fields = (
+        "created",
+        "name",
+        "levelname",
+        "pathname",
+        "module",
+        "funcName",
+        "lineno",
+        "process",
+        "processName",
+        "thread",
+        "threadName",
+    )
+
     def format(self, record):
-        obj = vars(record)
-        obj['message'] = record.getMessage()
+        obj = {key: getattr(record, key) for key in self.fields}
+        obj["message"] = record.getMessage()
 
         # JSON can't handle exc_info, use default format as string
-        if obj['exc_info']:
-            obj['exc_info'] = self.formatException(obj['exc_info'])
+        if record.exc_info:
+            obj["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            obj["exc_info"] = record.exc_text
 
-        # Delete internal fields
-        for key in ('msg', 'args'):
-            del obj[key]
+        for key, value in vars(record).items():
+            if key not in _recordAttributes:
+                obj[key] = value
 
-        return json.dumps(obj)
\ No newline at end of file
+        return _dumps(obj)
@@ -1,17 +1,23 @@
 # -*- coding: utf-8 -*-
 
 """
-Module comdirectpdfparser.log 
+Module comdirectpdfparser.log
 =================================================================
 
 A module
 
 """
+import atexit
+import copy
 import logging
 import logging.config
+import multiprocessing
+import random
+from logging.handlers import QueueHandler, QueueListener
 from os import environ
 from pathlib import Path
 from threading import Lock
+from typing import Dict
 
 here = Path(__file__).absolute().parent
 default_config_file = here / 'log.ini'
@@ -19,6 +25,8 @@ env_key = 'NLP_LOG_CONFIG_FILE'
 
 _lock = Lock()
 _configured = False
+_listener = None
+_queue = None
 
 
 # Disallow using of logging system before it's configured
@@ -29,10 +37,22 @@ def _uninitialized(*args, **kwargs):
 debug = info = warning = error = fatal = exception = get_logger = _uninitialized
 
 
+def _set_functions():
+    """Replace the module level functions by the real logging functions"""
+    global debug, info, warning, error, fatal, exception, get_logger
+
+    debug = logging.debug
+    info = logging.info
+    warning = logging.warning
+    error = logging.error
+    fatal = logging.fatal
+    exception = logging.exception
+    get_logger = logging.getLogger
+
+
 def setup(config_file=None):
     """Setup configuration system from config file (.ini format)"""
     global _configured
-    global debug, info, warning, error, fatal, exception, get_logger
 
     with _lock:
         if _configured:
@@ -44,12 +64,133 @@ def setup(config_file=None):
         logging.config.fileConfig(config_file)
 
         # Set real functions
-        debug = logging.debug
-        info = logging.info
-        warning = logging.warning
-        fatal = logging.fatal
-        exception = logging.exception
-        get_logger = logging.getLogger
+        _set_functions()
+
+        _configured = True
+
+
+class SamplingFilter(logging.Filter):
+    """Pass only a fraction of the records of the given loggers.
+
+    Rates are given per logger name and apply to its child loggers as well,
+    the most specific name wins. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache = {}
+
+    def rate(self, name: str) -> float:
+        """Sampling rate for a logger name"""
+        if name not in self._cache:
+            rate, depth = 1.0, -1
+            for prefix, r in self.rates.items():
+                if (name == prefix or name.startswith(prefix + '.')) and len(prefix) > depth:
+                    rate, depth = r, len(prefix)
+            self._cache[name] = rate
+        return self._cache[name]
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class _QueueHandler(QueueHandler):
+    """QueueHandler that only merges message and arguments in the calling thread,
+    all formatting is left to the handlers of the listener."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _queue_handler(queue, sampling=None):
+    handler = _QueueHandler(queue)
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+    return handler
+
+
+def setup_queue(config_file=None, queue=None, sampling=None):
+    """Setup configuration system from config file (.ini format), with the configured
+    handlers running in a listener thread. Logging calls only put the record on a
+    queue, worker processes can log to the same queue with setup_worker.
+
+    Args:
+        config_file: config file (.ini format), defaults to log.ini
+        queue: queue to use, defaults to a new multiprocessing queue
+        sampling (dict): logger name - fraction of the records below WARNING to keep
+
+    Returns:
+        the queue, to be passed to setup_worker in worker processes
+    """
+    global _configured, _listener, _queue
+
+    with _lock:
+        if _configured:
+            return _queue
+
+        if not config_file:
+            config_file = environ.get(env_key, default_config_file)
+
+        logging.config.fileConfig(config_file, disable_existing_loggers=False)
+
+        # move the configured handlers behind the queue
+        root = logging.getLogger()
+        handlers = root.handlers[:]
+        for handler in handlers:
+            root.removeHandler(handler)
+
+        _queue = queue if queue is not None else multiprocessing.Queue(-1)
+        _listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop)
+
+        root.addHandler(_queue_handler(_queue, sampling))
+
+        _set_functions()
 
         _configured = True
 
+    return _queue
+
+
+def setup_worker(queue, sampling=None, level=logging.DEBUG):
+    """Setup logging in a worker process, sending all records to the queue
+    returned by setup_queue in the main process.
+
+    Args:
+        queue: queue returned by setup_queue
+        sampling (dict): logger name - fraction of the records below WARNING to keep
+        level: level of the root logger
+    """
+    global _configured
+
+    with _lock:
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler(queue, sampling))
+        root.setLevel(level)
+
+        _set_functions()
+
+        _configured = True
+
+
+def stop():
+    """Stop the listener thread, after handling all queued records"""
+    global _listener
+
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.metrics
+=================================================================
+
+A module with live throughput metrics of the ingest.
+
+When a Metrics instance is passed to ComDirectParser (or AsyncComDirectParser)
+it records the parsed documents per type, the extraction and parse latencies,
+the queue depths and the documents written to mongodb. The metrics are served
+in the Prometheus text format by MetricsServer (on localhost by default) and
+written periodically as JSON by SnapshotWriter::
+
+    metrics = Metrics()
+    MetricsServer(metrics, port=9464).start()
+    SnapshotWriter(metrics, "/var/lib/comdirect/metrics.json", interval=30).start()
+    cdp = ComDirectParser(inputlist=[...], client=client, metrics=metrics)
+
+Rates are computed over a sliding window (60 seconds by default), latency
+percentiles over the most recent observations of each stage.
+
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Tuple
+
+import numpy as np
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Metrics:
+    """
+    Thread safe counters, latencies and gauges of an ingest.
+    """
+
+    def __init__(self, window: float = 60.0, samples: int = 1024, prefix: str = "comdirect") -> None:
+        self.window = window
+        self.samples = samples
+        self.prefix = prefix
+        self.started = time.time()
+
+        self._lock = threading.Lock()
+        # doc type - total documents
+        self.documents: Dict[str, int] = {}
+        # collection - total documents written
+        self.written: Dict[str, int] = {}
+        # stage - (count, sum of seconds, recent observations)
+        self.latencies: Dict[str, Tuple[int, float, Deque[float]]] = {}
+        # queue - current depth
+        self.queues: Dict[str, int] = {}
+        # (kind, label) - recent (time, count) events for the rates
+        self._events: Dict[Tuple[str, str], Deque[Tuple[float, int]]] = {}
+
+    def _event(self, kind: str, label: str, count: int, now: float) -> None:
+        events = self._events.setdefault((kind, label), deque())
+        events.append((now, count))
+        while events and events[0][0] < now - self.window:
+            events.popleft()
+
+    def document(self, doctype: str) -> None:
+        """Count a processed document.
+
+        Args:
+            doctype (str): document type, e.g. "div", "unknown" or "duplicate"
+        """
+        with self._lock:
+            self.documents[doctype] = self.documents.get(doctype, 0) + 1
+            self._event("documents", doctype, 1, time.time())
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record the duration of a stage for one document.
+
+        Args:
+            stage (str): stage, e.g. "extract" or "parse"
+            seconds (float): duration
+        """
+        with self._lock:
+            count, total, recent = self.latencies.get(stage, (0, 0.0, deque(maxlen=self.samples)))
+            recent.append(seconds)
+            self.latencies[stage] = (count + 1, total + seconds, recent)
+
+    def write(self, collection: str, count: int) -> None:
+        """Count documents written to a mongo collection.
+
+        Args:
+            collection (str): name of the collection
+            count (int): number of written documents
+        """
+        with self._lock:
+            self.written[collection] = self.written.get(collection, 0) + count
+            self._event("written", collection, count, time.time())
+
+    def queue(self, name: str, depth: int) -> None:
+        """Set the current depth of a queue.
+
+        Args:
+            name (str): name of the queue
+            depth (int): number of waiting items
+        """
+        with self._lock:
+            self.queues[name] = depth
+
+    def _rates(self, kind: str, now: float) -> Dict[str, float]:
+        # the window is shorter right after the start
+        window = max(min(self.window, now - self.started), 1e-9)
+        rates = {}
+        for (_kind, label), events in self._events.items():
+            if _kind == kind:
+                rates[label] = sum(c for t, c in events if t >= now - self.window) / window
+        return rates
+
+    def snapshot(self) -> Dict:
+        """Current state of all metrics.
+
+        Returns:
+            Dict: totals, rates per second, latency percentiles and queue depths
+        """
+        now = time.time()
+        with self._lock:
+            latencies = {}
+            for stage, (count, total, recent) in self.latencies.items():
+                values = np.quantile(np.fromiter(recent, dtype=np.float64), QUANTILES)
+                latencies[stage] = {
+                    "count": count,
+                    "sum": total,
+                    **{f"p{int(q * 100)}": float(v) for q, v in zip(QUANTILES, values)},
+                }
+
+            return {
+                "time": now,
+                "uptime": now - self.started,
+                "documents": dict(self.documents),
+                "documentsPerSecond": self._rates("documents", now),
+                "latency": latencies,
+                "queues": dict(self.queues),
+                "written": dict(self.written),
+                "writtenPerSecond": self._rates("written", now),
+            }
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: exposition text
+        """
+        snap = self.snapshot()
+        p = self.prefix
+        lines = []
+
+        def family(name: str, kind: str, helptext: str) -> None:
+            lines.append(f"# HELP {p}_{name} {helptext}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        family("documents_total", "counter", "Processed documents by type.")
+        for doctype, count in sorted(snap["documents"].items()):
+            lines.append(f'{p}_documents_total{{type="{doctype}"}} {count}')
+
+        family("documents_per_second", "gauge", "Processed documents per second by type.")
+        for doctype, rate in sorted(snap["documentsPerSecond"].items()):
+            lines.append(f'{p}_documents_per_second{{type="{doctype}"}} {rate:.6g}')
+
+        for stage, values in sorted(snap["latency"].items()):
+            family(f"{stage}_seconds", "summary", f"Duration of the {stage} stage per document.")
+            for q in QUANTILES:
+                lines.append(f'{p}_{stage}_seconds{{quantile="{q}"}} {values[f"p{int(q * 100)}"]:.6g}')
+            lines.append(f"{p}_{stage}_seconds_sum {values['sum']:.6g}")
+            lines.append(f"{p}_{stage}_seconds_count {values['count']}")
+
+        family("queue_depth", "gauge", "Items waiting per queue.")
+        for name, depth in sorted(snap["queues"].items()):
+            lines.append(f'{p}_queue_depth{{queue="{name}"}} {depth}')
+
+        family("mongo_written_total", "counter", "Documents written to mongodb by collection.")
+        for collection, count in sorted(snap["written"].items()):
+            lines.append(f'{p}_mongo_written_total{{collection="{collection}"}} {count}')
+
+        family("mongo_written_per_second", "gauge", "Documents written to mongodb per second by collection.")
+        for collection, rate in sorted(snap["writtenPerSecond"].items()):
+            lines.append(f'{p}_mongo_written_per_second{{collection="{collection}"}} {rate:.6g}')
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    HTTP endpoint serving the metrics in the Prometheus format on /metrics
+    and as JSON on /metrics.json, in a daemon thread.
+    """
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9464) -> None:
+        self.metrics = metrics
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path == "/metrics":
+                    body = metrics.prometheus().encode("utf-8")
+                    contenttype = "text/plain; version=0.0.4; charset=utf-8"
+                elif handler.path == "/metrics.json":
+                    body = json.dumps(metrics.snapshot()).encode("utf-8")
+                    contenttype = "application/json"
+                else:
+                    handler.send_error(404)
+                    return
+                handler.send_response(200)
+                handler.send_header("Content-Type", contenttype)
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                # scrapes would flood the logs
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        """Port the server listens on, useful when started with port 0."""
+        return self.server.server_address[1]
+
+    def start(self) -> "MetricsServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SnapshotWriter:
+    """
+    Write the metrics as JSON to a file every interval seconds, in a daemon
+    thread. The file is replaced atomically, so readers never see a partial
+    snapshot.
+    """
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 30.0) -> None:
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def write(self) -> None:
+        """Write one snapshot."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.metrics.snapshot(), f)
+        os.replace(tmp, self.path)
+
+    def _run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def start(self) -> "SnapshotWriter":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the thread and write a final snapshot."""
+        self.stopped.set()
+        self.thread.join()
+        self.write()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.numparse
+=================================================================
+
+A module for converting German formatted numbers (``1.234,56``) as found in
+the comdirect documents.
+
+Every value is checked against a precompiled pattern before conversion, so
+ambiguous input like ``1.234`` (thousands separator but no decimal comma)
+raises instead of silently becoming 1234. Values can be returned as float or
+as ``Decimal`` for exact money sums, and ``parseNumbers`` converts whole
+arrays of strings in one vectorized pass.
+
+"""
+import re
+from decimal import Decimal
+from typing import Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+# either thousands separators followed by a decimal comma,
+# or a plain number with an optional decimal comma
+germanNumberRe = r"[+-]?(?:\d{1,3}(?:\.\d{3})+,\d+|\d+(?:,\d+)?)"
+
+_valid = re.compile(germanNumberRe)
+
+# byte values for the vectorized validation
+_NL, _DOT, _COMMA, _PLUS, _MINUS, _SLASH, _ZERO = b"\n.,+-/0"
+
+
+def parseNumber(s: str, decimal: bool = False) -> Union[float, Decimal]:
+    """Convert a German formatted number string.
+
+    Args:
+        s (str): string to convert, e.g. "-1.234,56"
+        decimal (bool, optional): return a Decimal instead of a float. Defaults to False.
+
+    Raises:
+        ValueError: if the string is not a valid German formatted number
+
+    Returns:
+        Union[float, Decimal]: converted value
+    """
+    s = s.strip()
+    if _valid.fullmatch(s) is None:
+        raise ValueError(f"not a German formatted number: {s!r}")
+
+    s = s.replace(".", "").replace(",", ".")
+    if decimal:
+        return Decimal(s)
+    return float(s)
+
+
+def _invalidRecord(joined: str) -> int:
+    """Vectorized validation of newline separated number strings.
+
+    The checks run on the utf-8 bytes with numpy and are equivalent to matching
+    every record against germanNumberRe.
+
+    Args:
+        joined (str): number strings joined by newlines
+
+    Returns:
+        int: index of the first invalid record, -1 if all records are valid
+    """
+    # leading newline and trailing padding keep all shifted lookups in bounds
+    b = np.frombuffer(b"\n" + joined.encode("utf-8") + b"\n" * 5, dtype=np.uint8)
+    end = len(b) - 5
+    # uint8 arithmetic wraps around, a single comparison selects a byte range
+    digit = (b - np.uint8(_ZERO)) < 10
+    # allowed are "+,-." and digits (the range "+" to "9" minus "/") and newlines
+    notallowed = (((b - np.uint8(_PLUS)) > _ZERO + 9 - _PLUS) & (b != _NL)) | (b == _SLASH)
+
+    newlines = np.flatnonzero(b == _NL)
+    starts = newlines[newlines < end] + 1
+
+    dots = np.flatnonzero(b == _DOT)
+    commas = np.flatnonzero(b == _COMMA)
+    signs = np.flatnonzero((b == _PLUS) | (b == _MINUS))
+    seps = np.flatnonzero((b == _DOT) | (b == _COMMA) | (b == _NL))
+
+    # thousands separator: 1 to 3 digits before the first one,
+    # exactly 3 digits up to the next separator which is a dot or comma
+    nextdot = b[dots + 4]
+    baddots = ~(
+        digit[dots - 1]
+        & digit[dots + 1]
+        & digit[dots + 2]
+        & digit[dots + 3]
+        & ((nextdot == _DOT) | (nextdot == _COMMA))
+        & ~(digit[dots - 1] & digit[dots - 2] & digit[dots - 3] & digit[dots - 4])
+    )
+
+    # decimal comma: digits on both sides, nothing but digits up to the end
+    nextsep = b[seps[np.searchsorted(seps, commas) + 1]]
+    badcommas = ~(digit[commas - 1] & digit[commas + 1] & (nextsep == _NL))
+
+    # optional sign, then a digit
+    first = b[starts]
+    issign = (first == _PLUS) | (first == _MINUS)
+    badstarts = ~np.where(issign, digit[starts + 1], digit[starts])
+    badsigns = b[signs - 1] != _NL
+
+    badpos = np.concatenate(
+        (
+            np.flatnonzero(notallowed),
+            dots[baddots],
+            commas[badcommas],
+            starts[badstarts],
+            signs[badsigns],
+        )
+    )
+    if len(badpos) == 0:
+        return -1
+    return int(np.searchsorted(starts, badpos.min(), "right")) - 1
+
+
+def parseNumbers(values: Iterable[str], decimal: bool = False) -> np.ndarray:
+    """Convert an array of German formatted number strings in one pass.
+
+    Args:
+        values (Iterable[str]): strings to convert
+        decimal (bool, optional): return Decimal objects instead of floats. Defaults to False.
+
+    Raises:
+        ValueError: if any of the strings is not a valid German formatted number
+
+    Returns:
+        np.ndarray: float64 array, object array of Decimal if decimal is set
+    """
+    if isinstance(values, (pd.Series, np.ndarray)):
+        # iterating a list is much faster than iterating a Series
+        values = values.tolist()
+    values = [v.strip() for v in values]
+    if not values:
+        return np.array([], dtype=object if decimal else np.float64)
+
+    joined = "\n".join(values)
+    if joined.count("\n") != len(values) - 1:
+        # newline inside one of the values
+        invalid = next(i for i, v in enumerate(values) if "\n" in v)
+    else:
+        invalid = _invalidRecord(joined)
+    if invalid >= 0:
+        raise ValueError(f"not a German formatted number: {values[invalid]!r}")
+
+    parts = joined.replace(".", "").replace(",", ".").split("\n")
+    if decimal:
+        return np.array(list(map(Decimal, parts)), dtype=object)
+    return np.fromiter(map(float, parts), dtype=np.float64, count=len(parts))
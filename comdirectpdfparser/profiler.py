@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.profiler
+=================================================================
+
+A module for finding slow documents and the regular expressions responsible.
+
+When a PatternProfiler is passed to ComDirectParser, every pattern evaluation
+of the parse methods is timed. Documents whose parsing takes longer than the
+threshold are written to the dump folder: the extracted text as
+``<filename>.txt`` and the per-pattern timing breakdown as ``<filename>.json``.
+
+"""
+import json
+import os
+import re
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+
+class PatternProfiler:
+    """
+    Per-document timing of the pattern evaluations of ComDirectParser.
+    """
+
+    def __init__(self, dumpdir: str, threshold: float = 1.0) -> None:
+        self.dumpdir = dumpdir
+        self.threshold = threshold
+        # filename - total parse time of the documents above the threshold
+        self.flagged: Dict[str, float] = {}
+        self._timings: List[Tuple[str, str, float]] = []
+
+        os.makedirs(dumpdir, exist_ok=True)
+
+    def findall(self, pattern: str, string: str, flags: int = 0) -> list:
+        """Timed re.findall, recording the calling parse method and the pattern."""
+        start = perf_counter()
+        result = re.findall(pattern, string, flags)
+        elapsed = perf_counter() - start
+
+        self._timings.append((sys._getframe(1).f_code.co_name, pattern, elapsed))
+        return result
+
+    def breakdown(self) -> List[Dict]:
+        """Timings of the current document aggregated per method and pattern, slowest first.
+
+        Returns:
+            List[Dict]: method, pattern, number of calls and seconds
+        """
+        totals = {}
+        for method, pattern, elapsed in self._timings:
+            calls, seconds = totals.get((method, pattern), (0, 0.0))
+            totals[(method, pattern)] = (calls + 1, seconds + elapsed)
+
+        return [
+            {"method": method, "pattern": pattern, "calls": calls, "seconds": seconds}
+            for (method, pattern), (calls, seconds) in sorted(
+                totals.items(), key=lambda item: item[1][1], reverse=True
+            )
+        ]
+
+    @contextmanager
+    def document(self, filename: str, rawText: str):
+        """Context to time the parsing of one document, the document is dumped
+        when it takes longer than the threshold (also if parsing fails).
+
+        Args:
+            filename (str): name of the pdf file
+            rawText (str): raw pdf text
+        """
+        self._timings = []
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            total = perf_counter() - start
+            if total >= self.threshold:
+                self.flagged[filename] = total
+                self.dump(filename, rawText, total)
+
+    def dump(self, filename: str, rawText: str, total: float) -> None:
+        """Write the extracted text and the timing breakdown of the current document.
+
+        Args:
+            filename (str): name of the pdf file
+            rawText (str): raw pdf text
+            total (float): total parse time in seconds
+        """
+        base = os.path.join(self.dumpdir, filename)
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(rawText)
+
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(
+                {"filename": filename, "seconds": total, "patterns": self.breakdown()},
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
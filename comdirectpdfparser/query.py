@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.query
+=================================================================
+
+A module with range queries on the stored data.
+
+All queries filter on fields that lead one of the indexes created by
+ComDirectParser.ensureIndexes. When only fields of that index are requested
+(e.g. ``fields=["isin", "Date", "Net Before Tax"]`` for dividends by isin),
+mongodb answers the query from the index alone (covered query) without
+reading the documents.
+
+"""
+from datetime import datetime
+from typing import Dict, List
+
+import pandas as pd
+from pymongo import ASCENDING, MongoClient
+
+
+def _range(start: datetime = None, end: datetime = None) -> Dict:
+    """Range condition, start inclusive and end exclusive."""
+    condition = {}
+    if start is not None:
+        condition["$gte"] = start
+    if end is not None:
+        condition["$lt"] = end
+    return condition
+
+
+class ComDirectQuery:
+    """
+    Query the data saved by ComDirectParser.
+    """
+
+    def __init__(self, client: MongoClient, db_name: str = "ComDirect") -> None:
+        self.client = client
+        self.db = client[db_name]
+
+    def _find(
+        self, collection: str, query: Dict, fields: List[str] = None, datefield: str = "Date"
+    ) -> pd.DataFrame:
+        """Run a query and return the result as DataFrame sorted by date.
+
+        Args:
+            collection (str): name of the collection
+            query (Dict): filter
+            fields (List[str], optional): fields to return, all if None. Defaults to None.
+            datefield (str, optional): date field to sort on. Defaults to "Date".
+
+        Returns:
+            pd.DataFrame: result
+        """
+        projection = None
+        if fields:
+            projection = {field: 1 for field in fields}
+            # _id is not in the indexes, leaving it out allows covered queries
+            projection["_id"] = 0
+
+        cursor = self.db[collection].find(query, projection).sort(datefield, ASCENDING)
+        return pd.DataFrame(list(cursor))
+
+    def explain(self, collection: str, query: Dict, fields: List[str] = None) -> Dict:
+        """Query plan of a query, to check index usage.
+
+        Args:
+            collection (str): name of the collection
+            query (Dict): filter
+            fields (List[str], optional): fields to return. Defaults to None.
+
+        Returns:
+            Dict: explain output
+        """
+        projection = {field: 1 for field in fields} if fields else None
+        if projection:
+            projection["_id"] = 0
+        return self.db[collection].find(query, projection).explain()
+
+    def dividendQuery(
+        self, isin: str = None, account: str = None, start: datetime = None, end: datetime = None
+    ) -> Dict:
+        """Filter for dividends by isin or account and date range."""
+        query = {}
+        if isin is not None:
+            query["isin"] = isin
+        if account is not None:
+            query["Account"] = account
+        if start is not None or end is not None:
+            query["Date"] = _range(start, end)
+        return query
+
+    def dividends(
+        self,
+        isin: str = None,
+        account: str = None,
+        start: datetime = None,
+        end: datetime = None,
+        fields: List[str] = None,
+    ) -> pd.DataFrame:
+        """Dividends (div and divertrags) by isin or account, in a date range.
+
+        Args:
+            isin (str, optional): isin. Defaults to None.
+            account (str, optional): account. Defaults to None.
+            start (datetime, optional): first date (inclusive). Defaults to None.
+            end (datetime, optional): last date (exclusive). Defaults to None.
+            fields (List[str], optional): fields to return, all if None. Defaults to None.
+
+        Returns:
+            pd.DataFrame: dividends sorted by date
+        """
+        return self._find("div", self.dividendQuery(isin, account, start, end), fields)
+
+    def dividendTotal(
+        self, isin: str = None, account: str = None, start: datetime = None, end: datetime = None
+    ) -> float:
+        """Sum of the net dividends before tax, answered from the index (covered query).
+
+        Args:
+            isin (str, optional): isin. Defaults to None.
+            account (str, optional): account. Defaults to None.
+            start (datetime, optional): first date (inclusive). Defaults to None.
+            end (datetime, optional): last date (exclusive). Defaults to None.
+
+        Returns:
+            float: total net dividends before tax
+        """
+        fields = ["isin" if isin is not None else "Account", "Date", "Net Before Tax"]
+        df = self._find("div", self.dividendQuery(isin, account, start, end), fields)
+        if df.empty:
+            return 0.0
+        return float(df["Net Before Tax"].sum())
+
+    def trades(
+        self,
+        isin: str = None,
+        account: str = None,
+        tradetype: str = None,
+        start: datetime = None,
+        end: datetime = None,
+        fields: List[str] = None,
+    ) -> pd.DataFrame:
+        """Buy and sell orders by isin or account and type, in a date range.
+
+        Args:
+            isin (str, optional): isin. Defaults to None.
+            account (str, optional): account. Defaults to None.
+            tradetype (str, optional): buy or sell. Defaults to None.
+            start (datetime, optional): first date (inclusive). Defaults to None.
+            end (datetime, optional): last date (exclusive). Defaults to None.
+            fields (List[str], optional): fields to return, all if None. Defaults to None.
+
+        Returns:
+            pd.DataFrame: orders sorted by date
+        """
+        query = {}
+        if isin is not None:
+            query["isin"] = isin
+        if account is not None:
+            query["Account"] = account
+        if tradetype is not None:
+            query["Type"] = tradetype
+        if start is not None or end is not None:
+            query["Date"] = _range(start, end)
+        return self._find("buy_sell", query, fields)
+
+    def taxes(self, references: List[str], fields: List[str] = None) -> pd.DataFrame:
+        """Tax documents by tax reference number, e.g. those of a dividends() result.
+
+        Args:
+            references (List[str]): tax reference numbers
+            fields (List[str], optional): fields to return, all if None. Defaults to None.
+
+        Returns:
+            pd.DataFrame: tax documents
+        """
+        query = {"Tax Reference Number": {"$in": list(references)}}
+        return self._find("tax", query, fields)
+
+    def saldos(
+        self, account: str = None, start: datetime = None, end: datetime = None, fields: List[str] = None
+    ) -> pd.DataFrame:
+        """Month end saldos by account, in a date range.
+
+        Args:
+            account (str, optional): account. Defaults to None.
+            start (datetime, optional): first date (inclusive). Defaults to None.
+            end (datetime, optional): last date (exclusive). Defaults to None.
+            fields (List[str], optional): fields to return, all if None. Defaults to None.
+
+        Returns:
+            pd.DataFrame: saldos sorted by date
+        """
+        query = {}
+        if account is not None:
+            query["account"] = account
+        if start is not None or end is not None:
+            query["date"] = _range(start, end)
+        return self._find("saldos", query, fields, datefield="date")
+
+    def transactions(
+        self,
+        start: datetime = None,
+        end: datetime = None,
+        fields: List[str] = None,
+        category: str = None,
+    ) -> pd.DataFrame:
+        """Giro transactions in a date range, optionally of one category.
+
+        Args:
+            start (datetime, optional): first date (inclusive). Defaults to None.
+            end (datetime, optional): last date (exclusive). Defaults to None.
+            fields (List[str], optional): fields to return, all if None. Defaults to None.
+            category (str, optional): category, see comdirectpdfparser.categorize. Defaults to None.
+
+        Returns:
+            pd.DataFrame: transactions sorted by date
+        """
+        query = {}
+        if category is not None:
+            query["category"] = category
+        if start is not None or end is not None:
+            query["date"] = _range(start, end)
+        return self._find("giroTransactions", query, fields, datefield="date")
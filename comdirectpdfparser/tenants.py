@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.tenants
+=================================================================
+
+A module for ingesting the postbox archives of several account holders
+(tenants) in one run.
+
+Every tenant has its own input folders and its own database, named
+``<prefix><tenant>``, so the data of the tenants stays separated and each
+tenant database can be placed on its own shard. The files of all tenants
+are split into batches and scheduled round robin over one shared worker
+pool: whenever a worker is free it takes the next batch of the next tenant,
+so a tenant with a large archive gets no more than its share of the workers
+while others are waiting, and takes all of them once the others are done.
+
+Command line usage, with a JSON file mapping tenant to input folders::
+
+    python -m comdirectpdfparser.tenants tenants.json --workers 8
+
+"""
+import argparse
+import json
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Tuple
+
+from pymongo import MongoClient
+
+from . import ComDirectParser
+
+logger = logging.getLogger(__name__)
+
+# ComDirectParser arguments holding per-document state, which must not be shared
+# between tenants and threads
+_unsharedArguments = ("textstore", "dedup", "profiler")
+
+
+def roundRobin(batches: Dict[str, List[List[str]]]) -> Iterator[Tuple[str, List[str]]]:
+    """Interleave the batches of the tenants, one batch per tenant in turn.
+
+    Args:
+        batches (Dict[str, List[List[str]]]): tenant - batches of files
+
+    Yields:
+        Tuple[str, List[str]]: tenant, batch
+    """
+    queues = deque((tenant, deque(b)) for tenant, b in batches.items() if b)
+    while queues:
+        tenant, queue = queues.popleft()
+        yield tenant, queue.popleft()
+        if queue:
+            queues.append((tenant, queue))
+
+
+class TenantIngest:
+    """
+    Fair batch ingest of the input folders of several tenants into per-tenant databases.
+    """
+
+    def __init__(
+        self,
+        tenants: Dict[str, List[str]],
+        client: MongoClient,
+        workers: int = 4,
+        batchsize: int = 20,
+        prefix: str = "ComDirect_",
+        **parserkwargs,
+    ) -> None:
+        """
+        Args:
+            tenants (Dict[str, List[str]]): tenant - input folders and files
+            client (MongoClient): mongo client, shared by the workers
+            workers (int, optional): size of the worker pool. Defaults to 4.
+            batchsize (int, optional): files per batch. Defaults to 20.
+            prefix (str, optional): prefix of the tenant database names. Defaults to "ComDirect_".
+            parserkwargs: passed to every ComDirectParser, shared by all tenants and threads,
+                e.g. metrics, categorizer or headPages
+
+        Raises:
+            ValueError: for textstore, dedup or profiler, they are not safe to share
+        """
+        unshared = [name for name in _unsharedArguments if parserkwargs.get(name) is not None]
+        if unshared:
+            raise ValueError(f"{', '.join(unshared)} can not be shared between tenants")
+
+        self.tenants = tenants
+        self.client = client
+        self.workers = workers
+        self.batchsize = batchsize
+        self.prefix = prefix
+        self.parserkwargs = parserkwargs
+
+    def dbName(self, tenant: str) -> str:
+        """Name of the database of a tenant."""
+        return f"{self.prefix}{tenant}"
+
+    def batches(self) -> Dict[str, List[List[str]]]:
+        """Input files of every tenant, split into batches.
+
+        Returns:
+            Dict[str, List[List[str]]]: tenant - batches of files
+        """
+        batches = {}
+        for tenant, inputlist in self.tenants.items():
+            # same discovery as ComDirectParser
+            files = ComDirectParser(inputlist=list(inputlist), client=None).filelist
+            batches[tenant] = [files[i : i + self.batchsize] for i in range(0, len(files), self.batchsize)]
+        return batches
+
+    def ingestBatch(self, tenant: str, files: List[str]) -> Dict[str, int]:
+        """Parse a batch of files of a tenant and save it to the tenant database.
+
+        Every batch gets its own parser, so batches of the same tenant can run in parallel.
+
+        Args:
+            tenant (str): tenant
+            files (List[str]): files to ingest
+
+        Returns:
+            Dict[str, int]: number of parsed and failed files of the batch
+        """
+        parser = ComDirectParser(inputlist=[], client=self.client, **self.parserkwargs)
+        parser.parse(files, skipErrors=True)
+        parser.save(self.dbName(tenant))
+        return {
+            "files": len(parser.parsedfiles),
+            "failedFiles": len(parser.failed),
+        }
+
+    def run(self) -> Dict[str, Dict[str, int]]:
+        """Ingest the files of all tenants.
+
+        Returns:
+            Dict[str, Dict[str, int]]: tenant - number of batches, failed batches, files and failed files
+        """
+        stats = {tenant: {"batches": 0, "failed": 0, "files": 0, "failedFiles": 0} for tenant in self.tenants}
+        schedule = roundRobin(self.batches())
+
+        # threads: most of the time goes into the tika requests, which release the GIL
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        running = {}
+        try:
+            # one batch per worker in flight: the schedule is only advanced when a worker
+            # is free, so the pool never holds a backlog of a single tenant
+            for tenant, files in schedule:
+                if len(running) >= self.workers:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._collect(future, running.pop(future), stats)
+                running[executor.submit(self.ingestBatch, tenant, files)] = tenant
+
+            for future in list(running):
+                self._collect(future, running.pop(future), stats)
+        finally:
+            executor.shutdown(wait=True)
+
+        return stats
+
+    def _collect(self, future, tenant: str, stats: Dict[str, Dict[str, int]]) -> None:
+        stats[tenant]["batches"] += 1
+        try:
+            result = future.result()
+        except Exception:
+            # the other batches of the tenant are still ingested
+            logger.exception("batch of tenant %s failed", tenant)
+            stats[tenant]["failed"] += 1
+            return
+        for key, value in result.items():
+            stats[tenant][key] += value
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m comdirectpdfparser.tenants")
+    parser.add_argument("tenants", help="JSON file mapping tenant to a list of input folders")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--prefix", default="ComDirect_", help="prefix of the tenant database names")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batchsize", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    with open(args.tenants, encoding="utf-8") as f:
+        tenants = json.load(f)
+
+    ingest = TenantIngest(
+        tenants,
+        MongoClient(args.uri),
+        workers=args.workers,
+        batchsize=args.batchsize,
+        prefix=args.prefix,
+    )
+    for tenant, stats in ingest.run().items():
+        print(f"{tenant}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
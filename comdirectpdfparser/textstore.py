@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.textstore
+=================================================================
+
+A module with an append-only store for the raw text extracted by Tika.
+
+The store consists of two files: ``<path>.bin`` holding the utf-8 encoded
+text of all documents back to back, and ``<path>.idx`` holding one line
+``offset<TAB>length<TAB>key<TAB>source`` per document, source being the
+path of the extracted file (missing in older stores). Reading is done through ``mmap``,
+so iterating over the whole archive does not load it into memory.
+
+"""
+import mmap
+import os
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class TextStore:
+    """
+    Append-only store for extracted document text.
+
+    Documents are keyed by their filename (the same value that ends up in
+    the ``filename`` field of the parsed records). Appending an existing key
+    again stores the new text and makes it the current version, the old
+    bytes stay in the data file. Files with the same name in different
+    folders share a key, the path each text was extracted from is kept to
+    detect this, see source().
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.datafile = path + ".bin"
+        self.indexfile = path + ".idx"
+        self.index: Dict[str, Tuple[int, int]] = {}
+        # key - path of the extracted file
+        self.sources: Dict[str, str] = {}
+
+        self._writer = None
+        self._indexwriter = None
+        self._reader = None
+        self._mmap = None
+
+        folder = os.path.dirname(os.path.abspath(self.datafile))
+        os.makedirs(folder, exist_ok=True)
+
+        # make sure both files exist, so readers can always open them
+        for _file in (self.datafile, self.indexfile):
+            if not os.path.exists(_file):
+                open(_file, "wb").close()
+
+        self._loadIndex()
+
+    def _loadIndex(self) -> None:
+        """Load the offset index from disk. Index lines that point beyond the end
+        of the data file (interrupted append) are ignored.
+        """
+        size = os.path.getsize(self.datafile)
+        with open(self.indexfile, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # partially written last line
+                    break
+                offset, length, key, *source = line.rstrip("\n").split("\t", 3)
+                offset, length = int(offset), int(length)
+                if offset + length <= size:
+                    self.index[key] = (offset, length)
+                    if source:
+                        self.sources[key] = source[0]
+                    else:
+                        self.sources.pop(key, None)
+
+    def append(self, key: str, text: str, source: str = None) -> None:
+        """Append the text of a document to the store.
+
+        Args:
+            key (str): document key (filename)
+            text (str): extracted text
+            source (str, optional): path of the extracted file. Defaults to None.
+        """
+        for value in (key, source or ""):
+            if "\t" in value or "\n" in value:
+                raise ValueError(f"invalid key or source for text store: {value!r}")
+
+        if self._writer is None:
+            self._writer = open(self.datafile, "ab")
+            self._indexwriter = open(self.indexfile, "a", encoding="utf-8")
+
+        data = (text or "").encode("utf-8")
+        self._writer.seek(0, os.SEEK_END)
+        offset = self._writer.tell()
+
+        # data first, index second: a crash in between leaves
+        # unreferenced bytes, never a dangling index entry
+        self._writer.write(data)
+        self._writer.flush()
+        fields = [str(offset), str(len(data)), key] + ([] if source is None else [source])
+        self._indexwriter.write("\t".join(fields) + "\n")
+        self._indexwriter.flush()
+
+        self.index[key] = (offset, len(data))
+        if source is None:
+            self.sources.pop(key, None)
+        else:
+            self.sources[key] = source
+
+    def _view(self, end: int) -> mmap.mmap:
+        """Return a read-only memory map covering at least ``end`` bytes."""
+        if self._mmap is None or len(self._mmap) < end:
+            if self._mmap is not None:
+                self._mmap.close()
+            if self._reader is None:
+                self._reader = open(self.datafile, "rb")
+            self._mmap = mmap.mmap(self._reader.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def get(self, key: str) -> str:
+        """Get the text of a document.
+
+        Args:
+            key (str): document key (filename)
+
+        Returns:
+            str: extracted text
+        """
+        offset, length = self.index[key]
+        if length == 0:
+            return ""
+        view = self._view(offset + length)
+        return view[offset : offset + length].decode("utf-8")
+
+    def source(self, key: str) -> Optional[str]:
+        """Get the path of the file the text of a document was extracted from.
+
+        Args:
+            key (str): document key (filename)
+
+        Returns:
+            Optional[str]: path, None if not recorded
+        """
+        return self.sources.get(key)
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over the document keys in insertion order."""
+        return iter(list(self.index))
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """Iterate over ``(key, text)`` pairs, reading each text from the memory map."""
+        for key in self.keys():
+            yield key, self.get(key)
+
+    def close(self) -> None:
+        """Close all open file handles and memory maps."""
+        for handle in (self._mmap, self._reader, self._writer, self._indexwriter):
+            if handle is not None:
+                handle.close()
+        self._mmap = self._reader = self._writer = self._indexwriter = None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+
+    def __enter__(self) -> "TextStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -7,8 +7,22 @@ Module comdirectpdfparser.utils
 A module with utilities for the ComDirect REGEX parser class.
 
 """
+import io
+from datetime import datetime
+from typing import Tuple
+
 from tika import parser
 
+from .numparse import parseNumber
+
+# optional, needed to extract page ranges
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.errors import PdfReadError
+except ImportError:  # pragma: no cover
+    PdfReader = PdfWriter = None
+    PdfReadError = ValueError
+
 
 def readRaw(_file: str) -> dict:
     """Read raw pdf data from file.
@@ -23,19 +37,71 @@ def readRaw(_file: str) -> dict:
     return parser.from_file(_file)
 
 
+def readPages(_file: str, first: int = 0, last: int = None) -> Tuple[dict, int]:
+    """Read raw pdf data of a page range only. The pages are copied into a new
+    pdf in memory, so tika does not extract the other pages.
+
+    Args:
+        _file (str): PDF file to open
+        first (int, optional): first page (zero based). Defaults to 0.
+        last (int, optional): page after the last page, all pages if None. Defaults to None.
+
+    Raises:
+        ImportError: if pypdf is not installed
+        ValueError: if pypdf can not read the file
+
+    Returns:
+        Tuple[dict, int]: tika dict of the page range, number of pages in the file
+    """
+    if PdfReader is None:
+        raise ImportError("readPages requires pypdf")
+
+    try:
+        reader = PdfReader(_file)
+        pages = len(reader.pages)
+        writer = PdfWriter()
+        for page in reader.pages[first:last]:
+            writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+    except PdfReadError as e:
+        raise ValueError(f"could not read pages of {_file}: {e}") from e
+
+    return parser.from_buffer(buffer.getvalue()), pages
+
+
 def stringToNumber(s: str) -> float:
-    """Rudimentary string to float conversion if the string representation
-    contains both comma and dot.
+    """String to float conversion of German formatted numbers, e.g. "1.234,56".
 
     Pythonic way would be using locale, but this leads to problems on mac,
-    keep this method for the time being.
+    see comdirectpdfparser.numparse for the validated implementation.
 
     Args:
         s (str): string to convert to float
 
+    Raises:
+        ValueError: if the string is not a valid German formatted number
+
     Returns:
         float: float value of the input string
     """
 
-    s = float(s.replace(".", "").replace(",", "."))
-    return s
+    return parseNumber(s)
+
+
+def stringToDate(s: str) -> datetime:
+    """Convert a German formatted date, e.g. "24.03.2021" or "24.03.21".
+
+    Args:
+        s (str): string to convert to datetime
+
+    Raises:
+        ValueError: if the string is not a valid date
+
+    Returns:
+        datetime: date
+    """
+    try:
+        return datetime.strptime(s, "%d.%m.%Y")
+    except ValueError:
+        return datetime.strptime(s, "%d.%m.%y")
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.watch
+=================================================================
+
+A module with a long-running daemon that ingests new pdf files as they
+appear in the input folders.
+
+The folders are watched with inotify (Linux, through ctypes), other platforms
+fall back to polling. A file is only parsed once its size and modification
+time did not change for the debounce period, so partially written downloads
+are not picked up. A file that can not be parsed is logged and skipped, the
+other files of its batch are ingested. When saving fails (e.g. mongodb not
+reachable) the batch is kept and retried with exponential backoff. All files go through one ComDirectParser, which keeps the
+Tika server and the mongo connection warm between batches.
+
+Command line usage::
+
+    python -m comdirectpdfparser.watch FOLDER [FOLDER ...]
+
+"""
+import argparse
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from pymongo import MongoClient
+
+from . import ComDirectParser
+from .metrics import Metrics, MetricsServer, SnapshotWriter
+from .textstore import TextStore
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+_eventHeader = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Minimal inotify binding, raises OSError when inotify is not available.
+    """
+
+    mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not available")
+
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders: Dict[int, str] = {}
+
+    def addWatch(self, folder: str) -> None:
+        """Watch a folder for new and modified files."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), self.mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+        self.folders[wd] = folder
+
+    def read(self, timeout: float) -> List[str]:
+        """Wait for events.
+
+        Args:
+            timeout (float): maximum time to wait in seconds
+
+        Returns:
+            List[str]: paths of the files with events
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = _eventHeader.unpack_from(data, offset)
+            offset += _eventHeader.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if name and wd in self.folders:
+                paths.append(os.path.join(self.folders[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class WatchDaemon:
+    """
+    Watch folders and ingest new pdf files in near real time.
+    """
+
+    def __init__(
+        self,
+        parser: ComDirectParser,
+        folders: List[str] = None,
+        db_name: str = "ComDirect",
+        debounce: float = 2.0,
+        interval: float = 1.0,
+        processExisting: bool = False,
+        polling: bool = False,
+        maxBackoff: float = 300.0,
+    ) -> None:
+        self.parser = parser
+        self.folders = folders if folders is not None else parser.folders
+        self.db_name = db_name
+        self.debounce = debounce
+        self.interval = interval
+        self.processExisting = processExisting
+        self.polling = polling
+        self.maxBackoff = maxBackoff
+
+        # ingested files and files that failed to parse
+        self.seen = set()
+        # files of a batch that could not be saved, retried after the backoff
+        self.retry: List[str] = []
+        self.retryAt = 0.0
+        self.backoff = 0.0
+        # path - (size, mtime, time of the last change)
+        self.pending: Dict[str, Tuple[int, float, float]] = {}
+        self.stopped = threading.Event()
+
+    def _listFolders(self) -> List[str]:
+        paths = []
+        for folder in self.folders:
+            for file in os.listdir(folder):
+                # ignore the files starting with dots, as ComDirectParser
+                if not file.startswith("."):
+                    paths.append(os.path.join(folder, file))
+        return paths
+
+    def _candidate(self, path: str) -> None:
+        if (
+            path not in self.seen
+            and path not in self.retry
+            and not os.path.basename(path).startswith(".")
+        ):
+            self.pending.setdefault(path, (-1, -1.0, time.monotonic()))
+
+    def _ready(self) -> List[str]:
+        """Pending files that did not change during the debounce period."""
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime, changed) in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # moved away or removed before it was complete
+                del self.pending[path]
+                continue
+
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                self.pending[path] = (stat.st_size, stat.st_mtime, now)
+            elif now - changed >= self.debounce and os.path.isfile(path):
+                ready.append(path)
+                del self.pending[path]
+        return ready
+
+    def ingest(self, paths: List[str]) -> List[str]:
+        """Parse and save a batch of files. Files that fail to parse are logged and
+        not tried again, errors while saving are raised.
+
+        Args:
+            paths (List[str]): files to ingest
+
+        Returns:
+            List[str]: ingested files
+        """
+        self.parser.parse(paths, skipErrors=True)
+        failed = {_file for _file, _ in self.parser.failed}
+        self.seen.update(failed)
+
+        self.parser.save(self.db_name)
+        self.parser.clear()
+
+        ingested = [path for path in paths if path not in failed]
+        self.seen.update(ingested)
+        logger.info("ingested %d files, %d failed", len(ingested), len(failed))
+        return ingested
+
+    def tick(self, events: List[str] = ()) -> List[str]:
+        """One iteration: register candidates, ingest the ready files.
+
+        Args:
+            events (List[str], optional): paths reported by inotify, the folders are
+                listed when polling. Defaults to ().
+
+        Returns:
+            List[str]: ingested files
+        """
+        for path in self._listFolders() if self.polling else events:
+            self._candidate(path)
+
+        ready = self._ready()
+        if self.retry:
+            if time.monotonic() < self.retryAt:
+                self.retry.extend(ready)
+                return []
+            ready = self.retry + ready
+            self.retry = []
+
+        if not ready:
+            return []
+
+        try:
+            ingested = self.ingest(ready)
+        except Exception:
+            self.parser.clear()
+            self.retry = [path for path in ready if path not in self.seen]
+            self.backoff = min(max(2 * self.backoff, self.interval), self.maxBackoff)
+            self.retryAt = time.monotonic() + self.backoff
+            logger.exception("saving %d files failed, retry in %.0f s", len(self.retry), self.backoff)
+            return []
+
+        self.backoff = 0.0
+        return ingested
+
+    def run(self) -> None:
+        """Watch until stop() is called."""
+        existing = self._listFolders()
+        if self.processExisting:
+            for path in existing:
+                self._candidate(path)
+        else:
+            self.seen.update(existing)
+
+        inotify = None
+        if not self.polling:
+            try:
+                inotify = Inotify()
+                for folder in self.folders:
+                    inotify.addWatch(folder)
+            except (OSError, AttributeError, TypeError) as e:
+                logger.warning("inotify not available (%s), falling back to polling", e)
+                if inotify is not None:
+                    inotify.close()
+                inotify = None
+                self.polling = True
+
+        try:
+            while not self.stopped.is_set():
+                if inotify is not None:
+                    # wake up at least every interval to check pending files
+                    events = inotify.read(self.interval)
+                else:
+                    self.stopped.wait(self.interval)
+                    events = []
+                self.tick(events)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def stop(self) -> None:
+        """Stop the run loop after the current iteration."""
+        self.stopped.set()
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m comdirectpdfparser.watch")
+    parser.add_argument("folders", nargs="+")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="ComDirect")
+    parser.add_argument("--textstore", help="path of a text store for the extracted text")
+    parser.add_argument("--debounce", type=float, default=2.0)
+    parser.add_argument("--existing", action="store_true", help="also ingest the files already present")
+    parser.add_argument("--polling", action="store_true", help="do not use inotify")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on localhost")
+    parser.add_argument("--metrics-file", help="write a JSON metrics snapshot to this file")
+    parser.add_argument("--metrics-interval", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    metrics = None
+    if args.metrics_port is not None or args.metrics_file:
+        metrics = Metrics()
+    if args.metrics_port is not None:
+        MetricsServer(metrics, port=args.metrics_port).start()
+    if args.metrics_file:
+        SnapshotWriter(metrics, args.metrics_file, args.metrics_interval).start()
+
+    textstore = TextStore(args.textstore) if args.textstore else None
+    cdp = ComDirectParser(
+        inputlist=args.folders, client=MongoClient(args.uri), textstore=textstore, metrics=metrics
+    )
+    daemon = WatchDaemon(
+        cdp,
+        db_name=args.db,
+        debounce=args.debounce,
+        processExisting=args.existing,
+        polling=args.polling,
+    )
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
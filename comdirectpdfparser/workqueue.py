@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+
+"""
+Module comdirectpdfparser.workqueue
+=================================================================
+
+A module for distributing the ingest over several worker processes or hosts.
+
+A coordinator enqueues file paths into a mongodb collection. Workers claim
+batches of paths with a time limited lease, keep the lease alive with
+heartbeats while parsing, and write the results with the same semantics as
+ComDirectParser.save. Leases of crashed workers expire and the paths are
+claimed again by another worker. When the results can not be saved (e.g.
+mongodb not reachable) the batch goes back to the queue without counting
+the attempt, and the worker waits with exponential backoff.
+
+Command line usage on a single box::
+
+    python -m comdirectpdfparser.workqueue enqueue FOLDER [FOLDER ...]
+    python -m comdirectpdfparser.workqueue work --processes 4
+
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from pymongo import ASCENDING, MongoClient, ReturnDocument, UpdateOne
+
+from . import ComDirectParser
+from .textstore import TextStore
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class LeaseQueue:
+    """
+    MongoDB backed work queue with leases.
+
+    Every queue entry is a document with the file path as ``_id``, a state
+    (pending, leased, done, failed), the owning worker, the lease expiry time
+    and the number of attempts.
+    """
+
+    def __init__(self, collection, lease: float = 300.0, maxattempts: int = 3) -> None:
+        self.collection = collection
+        self.lease = lease
+        self.maxattempts = maxattempts
+        self.collection.create_index([("state", ASCENDING), ("leaseUntil", ASCENDING)])
+
+    def _leaseUntil(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease)
+
+    def enqueue(self, paths: Iterable[str]) -> int:
+        """Add file paths to the queue, paths already in the queue are left untouched.
+
+        Args:
+            paths (Iterable[str]): files to ingest
+
+        Returns:
+            int: number of newly enqueued paths
+        """
+        ops = [
+            UpdateOne(
+                {"_id": path},
+                {"$setOnInsert": {"state": PENDING, "attempts": 0, "worker": None, "leaseUntil": None}},
+                upsert=True,
+            )
+            for path in paths
+        ]
+        if not ops:
+            return 0
+        return self.collection.bulk_write(ops, ordered=False).upserted_count
+
+    def claim(self, worker: str, batchsize: int = 10) -> List[str]:
+        """Claim a batch of pending paths, or paths whose lease expired. Expired paths
+        that reached the maximum number of attempts (e.g. a file that kills its worker)
+        are not claimed again, see requeueExpired.
+
+        Args:
+            worker (str): worker id
+            batchsize (int, optional): maximum number of paths. Defaults to 10.
+
+        Returns:
+            List[str]: claimed paths, empty if there is no work
+        """
+        claimed = []
+        for _ in range(batchsize):
+            doc = self.collection.find_one_and_update(
+                {
+                    "$or": [
+                        {"state": PENDING},
+                        {
+                            "state": LEASED,
+                            "leaseUntil": {"$lt": datetime.utcnow()},
+                            "attempts": {"$lt": self.maxattempts},
+                        },
+                    ]
+                },
+                {
+                    "$set": {"state": LEASED, "worker": worker, "leaseUntil": self._leaseUntil()},
+                    "$inc": {"attempts": 1},
+                },
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                break
+            claimed.append(doc["_id"])
+        return claimed
+
+    def heartbeat(self, worker: str, paths: List[str]) -> int:
+        """Extend the lease of paths still owned by the worker.
+
+        Args:
+            worker (str): worker id
+            paths (List[str]): claimed paths
+
+        Returns:
+            int: number of leases extended
+        """
+        result = self.collection.update_many(
+            {"_id": {"$in": paths}, "worker": worker, "state": LEASED},
+            {"$set": {"leaseUntil": self._leaseUntil()}},
+        )
+        return result.modified_count
+
+    def complete(self, worker: str, paths: List[str]) -> int:
+        """Mark paths owned by the worker as done.
+
+        Args:
+            worker (str): worker id
+            paths (List[str]): processed paths
+
+        Returns:
+            int: number of paths marked done
+        """
+        result = self.collection.update_many(
+            {"_id": {"$in": paths}, "worker": worker, "state": LEASED},
+            {"$set": {"state": DONE, "leaseUntil": None}},
+        )
+        return result.modified_count
+
+    def release(self, worker: str, paths: List[str], error: str = None, countAttempt: bool = True) -> None:
+        """Give paths owned by the worker back to the queue. Paths that reached the
+        maximum number of attempts are marked failed.
+
+        Args:
+            worker (str): worker id
+            paths (List[str]): paths that could not be processed
+            error (str, optional): error message stored with the entries
+            countAttempt (bool, optional): count the attempt against maxattempts, False for
+                failures that are not caused by the files. Defaults to True.
+        """
+        owned = {"_id": {"$in": paths}, "worker": worker, "state": LEASED}
+        if not countAttempt:
+            self.collection.update_many(
+                owned,
+                {
+                    "$set": {"state": PENDING, "worker": None, "leaseUntil": None, "error": error},
+                    "$inc": {"attempts": -1},
+                },
+            )
+            return
+        self.collection.update_many(
+            {**owned, "attempts": {"$gte": self.maxattempts}},
+            {"$set": {"state": FAILED, "leaseUntil": None, "error": error}},
+        )
+        self.collection.update_many(
+            owned, {"$set": {"state": PENDING, "worker": None, "leaseUntil": None, "error": error}}
+        )
+
+    def requeueExpired(self) -> int:
+        """Put paths with an expired lease back to pending. Paths that reached the
+        maximum number of attempts are marked failed.
+
+        Returns:
+            int: number of requeued paths
+        """
+        expired = {"state": LEASED, "leaseUntil": {"$lt": datetime.utcnow()}}
+        self.collection.update_many(
+            {**expired, "attempts": {"$gte": self.maxattempts}},
+            {"$set": {"state": FAILED, "leaseUntil": None, "error": "lease expired"}},
+        )
+        result = self.collection.update_many(
+            expired, {"$set": {"state": PENDING, "worker": None, "leaseUntil": None}}
+        )
+        return result.modified_count
+
+    def counts(self) -> Dict[str, int]:
+        """Number of queue entries per state."""
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for doc in self.collection.aggregate([{"$group": {"_id": "$state", "n": {"$sum": 1}}}]):
+            counts[doc["_id"]] = doc["n"]
+        return counts
+
+
+class Worker:
+    """
+    Worker that claims batches from a LeaseQueue, parses them and saves the results.
+    """
+
+    def __init__(
+        self,
+        client: MongoClient,
+        queue: LeaseQueue,
+        db_name: str = "ComDirect",
+        batchsize: int = 10,
+        worker: str = None,
+        textstore: TextStore = None,
+        retryInterval: float = 1.0,
+        maxBackoff: float = 300.0,
+    ) -> None:
+        self.client = client
+        self.queue = queue
+        self.db_name = db_name
+        self.batchsize = batchsize
+        self.worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        self.textstore = textstore
+        self.retryInterval = retryInterval
+        self.maxBackoff = maxBackoff
+        # seconds to wait before the next claim after a failed save
+        self.backoff = 0.0
+
+    def _heartbeat(self, paths: List[str], stop: threading.Event) -> None:
+        while not stop.wait(self.queue.lease / 3):
+            self.queue.heartbeat(self.worker, paths)
+
+    def runOnce(self) -> int:
+        """Claim and process one batch.
+
+        Returns:
+            int: number of claimed paths, 0 if the queue had no work
+        """
+        paths = self.queue.claim(self.worker, self.batchsize)
+        if not paths:
+            return 0
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(paths, stop), daemon=True)
+        heartbeat.start()
+
+        parser = ComDirectParser(inputlist=[], client=self.client, textstore=self.textstore)
+        done, failed = [], []
+        try:
+            for path in paths:
+                filename = path.split("/")[-1]
+                try:
+                    parsed = parser.parse_document(filename, parser.readText(path))
+                except Exception as e:
+                    logger.exception("failed to parse %s", path)
+                    failed.append((path, repr(e)))
+                    continue
+                parser.parsedfiles.append(filename)
+                if parsed is not None:
+                    parser.collect(parsed)
+                done.append(path)
+
+            parser.save(self.db_name)
+        except Exception as e:
+            # e.g. mongodb not reachable: not the fault of the files, the batch is retried
+            # after the backoff without counting the attempt and the worker keeps running
+            self.backoff = min(max(2 * self.backoff, self.retryInterval), self.maxBackoff)
+            logger.exception("failed to save batch, retry in %.0f s", self.backoff)
+            unsaved = [path for path in paths if path not in dict(failed)]
+            self.queue.release(self.worker, unsaved, repr(e), countAttempt=False)
+            for path, error in failed:
+                self.queue.release(self.worker, [path], error)
+            return len(paths)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        self.backoff = 0.0
+
+        self.queue.complete(self.worker, done)
+        for path, error in failed:
+            self.queue.release(self.worker, [path], error)
+
+        return len(paths)
+
+    def run(self, idle: float = 5.0, exitWhenEmpty: bool = False) -> int:
+        """Process batches until the queue is empty (exitWhenEmpty) or forever.
+
+        Args:
+            idle (float, optional): seconds to wait when there is no work. Defaults to 5.0.
+            exitWhenEmpty (bool, optional): return when there is no work. Defaults to False.
+
+        Returns:
+            int: number of processed paths
+        """
+        total = 0
+        wait = threading.Event()
+        while True:
+            n = self.runOnce()
+            total += n
+            if self.backoff:
+                wait.wait(self.backoff)
+            if n == 0:
+                # entries of crashed workers
+                self.queue.requeueExpired()
+                if exitWhenEmpty:
+                    return total
+                wait.wait(idle)
+
+
+def _work(uri: str, db_name: str, queue_name: str, lease: float, batchsize: int, exitWhenEmpty: bool):
+    """Entry point of a worker process."""
+    client = MongoClient(uri)
+    queue = LeaseQueue(client[db_name][queue_name], lease=lease)
+    Worker(client, queue, db_name=db_name, batchsize=batchsize).run(exitWhenEmpty=exitWhenEmpty)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m comdirectpdfparser.workqueue")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="ComDirect")
+    parser.add_argument("--queue", default="workQueue", help="name of the queue collection")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="enqueue files and folders")
+    enqueue.add_argument("inputs", nargs="+")
+
+    work = sub.add_parser("work", help="run worker processes")
+    work.add_argument("--processes", type=int, default=os.cpu_count())
+    work.add_argument("--batchsize", type=int, default=10)
+    work.add_argument("--lease", type=float, default=300.0)
+    work.add_argument("--exit-when-empty", action="store_true")
+
+    sub.add_parser("status", help="show the number of queue entries per state")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "work":
+        processes = [
+            multiprocessing.Process(
+                target=_work,
+                args=(args.uri, args.db, args.queue, args.lease, args.batchsize, args.exit_when_empty),
+            )
+            for _ in range(args.processes)
+        ]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        return
+
+    client = MongoClient(args.uri)
+    queue = LeaseQueue(client[args.db][args.queue])
+
+    if args.command == "enqueue":
+        # same discovery as ComDirectParser
+        paths = ComDirectParser(inputlist=args.inputs, client=None).filelist
+        print(f"enqueued {queue.enqueue(paths)} of {len(paths)} files")
+    else:
+        print(queue.counts())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.aio` module."""
+
+import asyncio
+import pathlib
+import tempfile
+
+import pytest
+
+from comdirectpdfparser.aio import AsyncComDirectParser
+from comdirectpdfparser.textstore import TextStore
+
+from .test_comdirectpdfparser import TAXTEXT
+
+
+class _AsyncCollection:
+    """Minimal async facade over a synchronous collection, standing in for motor."""
+
+    def __init__(self, col):
+        self.col = col
+
+    async def create_index(self, *args, **kwargs):
+        return self.col.create_index(*args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return self.col.insert_many(*args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return self.col.bulk_write(*args, **kwargs)
+
+
+class _AsyncClient:
+    def __init__(self, client):
+        self.client = client
+
+    def __getitem__(self, db_name):
+        db = self.client[db_name]
+
+        class _DB:
+            def __getitem__(_, name):
+                return _AsyncCollection(db[name])
+
+        return _DB()
+
+
+def test_run(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+
+    with TextStore(str(tmp_path / "store")) as store:
+        for i in range(25):
+            filename = f"tax{i}.pdf"
+            (docs / filename).write_bytes(b"")
+            store.append(filename, TAXTEXT.replace("1A2B3C4D", f"REF{i}"))
+        (docs / "other.pdf").write_bytes(b"")
+        store.append("other.pdf", "Kontoauszug")
+
+        acdp = AsyncComDirectParser(
+            [str(docs)], _AsyncClient(client), textstore=store, queuesize=2, batchsize=4
+        )
+        stats = asyncio.run(acdp.run(db_name="test"))
+
+    assert stats["files"] == 26
+    assert stats["unknown"] == 1
+    assert stats["failed"] == 0
+    assert stats["tax"] == 25
+    assert client["test"]["tax"].count_documents({}) == 25
+    assert client["test"]["parserVersions"].count_documents({}) == 26
+
+
+
+def test_run_skips_failing_documents(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+
+    with TextStore(str(tmp_path / "store")) as store:
+        for i in range(10):
+            filename = f"tax{i}.pdf"
+            (docs / filename).write_bytes(b"")
+            store.append(filename, TAXTEXT.replace("1A2B3C4D", f"REF{i}"))
+        # classified as tax, but parse_tax fails
+        (docs / "broken.pdf").write_bytes(b"")
+        store.append("broken.pdf", "Steuerliche Behandlung")
+
+        acdp = AsyncComDirectParser([str(docs)], _AsyncClient(client), textstore=store, batchsize=4)
+        stats = asyncio.run(acdp.run(db_name="test"))
+
+    assert stats["files"] == 11
+    assert stats["failed"] == 1
+    assert stats["tax"] == 10
+    assert client["test"]["tax"].count_documents({}) == 10
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_run
+
+    the_test_you_want_to_debug(pathlib.Path(tempfile.mkdtemp()))
+    print("-*# finished #*-")
+# ==============================================================================
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.categorize` module."""
+
+import json
+import pathlib
+import pickle
+import re
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from comdirectpdfparser import ComDirectParser
+from comdirectpdfparser.categorize import Categorizer, _reParser, _requiredLiterals
+
+RULES = [
+    ("groceries", "REWE"),
+    ("groceries", "EDEKA"),
+    ("dividends", "Kupon"),
+    ("transfer", r"Übertrag|Überweisung"),
+    ("card", r"Karten(verfügung|zahlung)"),
+    ("shopping", "Amazon"),
+]
+
+
+def test_categorize():
+    c = Categorizer(RULES)
+    assert c.categorize("Lastschrift\nREWE Markt GmbH") == "groceries"
+    assert c.categorize("Kupon\nApple Inc.") == "dividends"
+    assert c.categorize("Kartenzahlung\nTankstelle") == "card"
+    assert c.categorize("Gutschrift\nArbeitgeber") == "other"
+
+    # case insensitive by default
+    assert c.categorize("lastschrift\nrewe markt") == "groceries"
+    assert Categorizer(RULES, flags=0).categorize("lastschrift\nrewe markt") == "other"
+
+
+def test_priority():
+    # the first matching rule wins, for literals and regular expressions alike
+    c = Categorizer(RULES)
+    assert c.categorize("Übertrag\nREWE Markt") == "groceries"
+    assert c.categorize("Kartenverfügung\nAmazon EU") == "card"
+    assert c.categorize("Amazon EU\nKartenverfügung") == "card"
+    assert Categorizer(list(reversed(RULES))).categorize("Kartenverfügung\nAmazon EU") == "shopping"
+
+    # overlapping literals
+    c = Categorizer([("b", "abcd"), ("a", "bc"), ("c", "xbcdy")])
+    assert c.categorize("xbcdy") == "a"
+    assert c.categorize("zabcde") == "b"
+
+
+def test_requiredLiterals():
+    def literals(pattern, flags=0):
+        return _requiredLiterals(_reParser.parse(pattern, flags), bool(flags & re.IGNORECASE))
+
+    # the most selective literals
+    assert sorted(literals(r"Karten(verfügung|zahlung)")) == ["verfügung", "zahlung"]
+    assert literals(r"Lastschrift (REWE|EDEKA)") == ["Lastschrift "]
+    assert literals(r"(REWE|EDEKA)\s+Markt") == ["Markt"]
+    assert sorted(literals(r"(REWE|EDEKA)\s+\d")) == ["EDEKA", "REWE"]
+    assert literals(r"Miete\.") == ["Miete."]
+    assert literals(r"x(abc)+y") == ["abc"]
+    assert literals(r"\d+") is None
+    assert literals(r"(abc)?\d") is None
+    assert literals(r"abc|\d") is None
+    assert literals(r"(?i:abc)d") is None
+    assert literals(r"(?i:abc)d", re.IGNORECASE) == ["abc"]
+
+
+def test_regex_rules_match_like_search():
+    rules = [
+        ("a", r"Karten(verfügung|zahlung)"),
+        ("b", r"\d{4} ?EUR"),
+        ("c", r"Miete|Nebenkosten"),
+        ("d", "REWE"),
+        ("e", r"(?i:amazon)\s+EU"),
+        ("f", r"Gutschrift"),
+    ]
+    texts = [
+        "Kartenzahlung\nREWE",
+        "Lastschrift\nMiete 1234 EUR",
+        "Lastschrift\nAMAZON eu",
+        "Gutschrift\nREWE",
+        "Kartenverfügung\nAmazon EU 2021EUR",
+        "nichts",
+    ]
+    for flags in (re.IGNORECASE, 0):
+        c = Categorizer(rules, flags=flags)
+        for text in texts:
+            expected = next((cat for cat, pattern in rules if re.search(pattern, text, flags)), "other")
+            assert c.categorize(text) == expected, (text, flags)
+
+    # only rules without a required literal are evaluated on every text
+    assert Categorizer(rules)._unfiltered == []
+    assert Categorizer(rules, flags=0)._unfiltered == [4]
+
+
+def test_no_rules():
+    assert Categorizer([]).categorize("Kupon") == "other"
+    assert Categorizer({}, default="unknown").categorize("Kupon") == "unknown"
+
+
+def test_cache():
+    c = Categorizer(RULES, cachesize=2)
+    for text in ("REWE", "EDEKA", "REWE", "Kupon"):
+        c.categorize(text)
+    assert len(c._cache) <= 2
+
+    # the cache is not pickled, e.g. for process pool workers
+    c = pickle.loads(pickle.dumps(c))
+    assert c._cache == {}
+    assert c.categorize("REWE") == "groceries"
+
+
+def test_categorizeFrame_and_records():
+    c = Categorizer({"groceries": ["REWE", "EDEKA"], "dividends": ["Kupon"]})
+    df = pd.DataFrame(
+        {
+            "type": ["Lastschrift", "Kupon", "Lastschrift", "Übertrag"],
+            "details": ["REWE Markt", "Apple Inc.", "REWE Markt", None],
+        },
+        index=[10, 11, 12, 13],
+    )
+    categories = c.categorizeFrame(df)
+    assert categories.tolist() == ["groceries", "dividends", "groceries", "other"]
+    assert categories.index.tolist() == [10, 11, 12, 13]
+    assert c.categorizeFrame(df.iloc[:0]).empty
+
+    records = df.to_dict(orient="records")
+    c.categorizeRecords(records)
+    assert [r["category"] for r in records] == categories.tolist()
+
+
+def test_fromFile(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"dividends": ["Kupon"], "transfer": ["Übertrag"]}), encoding="utf-8")
+    c = Categorizer.fromFile(str(path), default="unknown")
+    assert c.rules == [("dividends", "Kupon"), ("transfer", "Übertrag")]
+    assert c.categorize("Übertrag\nMiete") == "transfer"
+    assert c.categorize("Gutschrift") == "unknown"
+
+
+def test_frames():
+    c = Categorizer({"dividends": ["Kupon"]})
+    cdp = ComDirectParser(inputlist=[], client=None, categorizer=c)
+    giro = pd.DataFrame(
+        {
+            "date": [datetime(2021, 3, 1), datetime(2021, 3, 2)],
+            "ValDate": [datetime(2021, 3, 1), datetime(2021, 3, 2)],
+            "type": ["Kupon", "Lastschrift"],
+            "details": ["Apple Inc.", "REWE Markt"],
+            "value": [12.5, -30.0],
+        }
+    )
+    parsed = {"filename": "report.pdf", "Type": "finanzreport", "saldos": pd.DataFrame(), "giroTransactions": giro}
+    frames = cdp.frames(parsed)
+    assert frames["giroTransactions"]["category"].tolist() == ["dividends", "other"]
+    assert "category" not in giro
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_fromFile
+
+    the_test_you_want_to_debug(pathlib.Path(tempfile.mkdtemp()))
+    print("-*# finished #*-")
+# ==============================================================================
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.columnar` module."""
+
+import numpy as np
+import pandas as pd
+
+from comdirectpdfparser.columnar import ColumnStore
+
+
+def test_append_chunks():
+    store = ColumnStore(chunksize=2)
+    store.append({"a": 1.0, "b": "x"})
+    store.append({"a": 2.0})
+    store.append({"a": 3.0, "c": 5.0})
+    assert len(store) == 3
+
+    df = store.toDataFrame()
+    assert list(df.columns) == ["a", "b", "c"]
+    assert df["a"].dtype == np.float64
+    assert df["a"].tolist() == [1.0, 2.0, 3.0]
+    assert df["b"].isna().tolist() == [False, True, True]
+
+    # consolidated once, no copies afterwards
+    assert store.toDataFrame() is df
+
+
+def test_extend_dataframe_and_documents():
+    store = ColumnStore()
+    store.extend([{"name": "Giro", "saldo": 1.5}])
+    store.extend(pd.DataFrame({"name": ["Depot"], "saldo": [np.nan]}))
+    assert store.toDocuments() == [{"name": "Giro", "saldo": 1.5}, {"name": "Depot"}]
+    assert store.toDocuments(start=1) == [{"name": "Depot"}]
+
+    store.clear()
+    assert len(store) == 0
+    assert store.toDataFrame().empty
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_append_chunks
+
+    the_test_you_want_to_debug()
+    print("-*# finished #*-")
+# ==============================================================================
@@ -2,7 +2,31 @@
 
 """Tests for comdirectpdfparser package."""
 
+from datetime import datetime
+
+import pytest
+
 import comdirectpdfparser
+from comdirectpdfparser import ComDirectParser
+from comdirectpdfparser.categorize import Categorizer
+from comdirectpdfparser.textstore import TextStore
+
+TAXTEXT = (
+    "Steuermitteilung\n"
+    "Steuerliche Behandlung: Ausländische Dividende\n"
+    "Referenz-Nr. 1A2B3C4D\n"
+    "Zu Ihren Gunsten vor Steuern EUR 100,00\n"
+    "Zu Ihren Gunsten nach Steuern EUR 73,62\n"
+)
+
+DIVTEXT = (
+    "Dividendengutschrift\n"
+    "DE12 3456 7890 1234 5678 00   EUR   15.03.2021   EUR   60,00\n"
+    "USD 0,82 Dividende pro Stück\n"
+    "Bruttobetrag: USD 82,00\n"
+    "Devisenkurs: EUR/USD 1,2000\n"
+    "(Referenz-Nr. 1A2B3C4D)\n"
+)
 
 
 def test_hello_noargs():
@@ -15,6 +39,280 @@ def test_hello_me():
     """Test for comdirectpdfparser.hello('me')."""
     s = comdirectpdfparser.hello('me')
     assert s=="Hello me"
+
+
+
+def test_parse_account_date():
+    cdp = ComDirectParser(inputlist=[], client=None)
+    text = "DE12 3456 7890 1234 5678 90   EUR   24.03.2021   EUR   1.234,56\n"
+    acc = cdp.parse_account(text, "buy")
+    assert acc["Date"] == datetime(2021, 3, 24)
+    assert acc["Total Cost"] == 1234.56
+
+
+def test_parse_document_tax():
+    cdp = ComDirectParser(inputlist=[], client=None)
+    parsed = cdp.parse_document("tax.pdf", TAXTEXT)
+    assert parsed["Type"] == "tax"
+    assert parsed["Tax Reference Number"] == "1A2B3C4D"
+    assert parsed["After Tax"] == 73.62
+    assert cdp.parse_document("other.pdf", "Kontoauszug") is None
+
+
+def test_extract_head_pages(monkeypatch):
+    # document name - (text of the first two pages, full text, number of pages)
+    docs = {
+        "tax.pdf": (TAXTEXT, TAXTEXT + "Anhang\n", 6),
+        "report.pdf": ("Finanzreport\n", "Finanzreport\nSeite 3\n", 6),
+        "other.pdf": ("Anhang\n", "Anhang\n" + TAXTEXT, 6),
+        "short.pdf": ("Kontoauszug\n", "Kontoauszug\n", 2),
+    }
+    full = []
+
+    def readPages(_file, first, last):
+        return {"content": docs[_file][0]}, docs[_file][2]
+
+    def readRaw(_file):
+        full.append(_file)
+        return {"content": docs[_file][1]}
+
+    monkeypatch.setattr(comdirectpdfparser, "readPages", readPages)
+    monkeypatch.setattr(comdirectpdfparser, "readRaw", readRaw)
+
+    cdp = ComDirectParser(inputlist=[], client=None)
+    assert cdp.extract("tax.pdf") == TAXTEXT
+    assert cdp.extract("report.pdf") == "Finanzreport\nSeite 3\n"
+    assert cdp.extract("other.pdf").endswith(TAXTEXT)
+    assert cdp.extract("short.pdf") == "Kontoauszug\n"
+    assert full == ["report.pdf", "other.pdf"]
+
+    # all pages when disabled
+    assert ComDirectParser(inputlist=[], client=None, headPages=None).extract("tax.pdf").endswith("Anhang\n")
+
+
+def test_readText_same_filename_in_different_folders(tmp_path, monkeypatch):
+    extracted = []
+
+    def extract(self, _file):
+        extracted.append(_file)
+        return _file
+
+    monkeypatch.setattr(ComDirectParser, "extract", extract)
+    a, b = str(tmp_path / "a" / "tax.pdf"), str(tmp_path / "b" / "tax.pdf")
+
+    with TextStore(str(tmp_path / "store")) as store:
+        cdp = ComDirectParser(inputlist=[], client=None, textstore=store)
+        assert cdp.readText(a) == a
+        assert cdp.readText(b) == b
+        # the store keeps the first file
+        assert cdp.readText(a) == a
+        assert store.get("tax.pdf") == a
+        assert extracted == [a, b]
+
+
+def test_parse_and_save(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    with TextStore(str(tmp_path / "store")) as store:
+        for i in range(3):
+            (docs / f"tax{i}.pdf").write_bytes(b"")
+            store.append(f"tax{i}.pdf", TAXTEXT.replace("1A2B3C4D", f"REF{i}"))
+
+        cdp = ComDirectParser(inputlist=[str(docs)], client=client, textstore=store)
+        div, buysell, tax, saldos, giro = cdp.parse()
+
+    assert div.empty
+    assert sorted(tax["Tax Reference Number"]) == ["REF0", "REF1", "REF2"]
+    assert tax["Total Tax"].dtype == float
+
+    cdp.save(db_name="test")
+    assert client["test"]["tax"].count_documents({}) == 3
+
+
+def test_parse_and_save_div_fxrate(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "div.pdf").write_bytes(b"")
+    with TextStore(str(tmp_path / "store")) as store:
+        store.append("div.pdf", DIVTEXT)
+
+        cdp = ComDirectParser(inputlist=[str(docs)], client=client, textstore=store)
+        div, buysell, tax, saldos, giro = cdp.parse()
+
+    doc = div.iloc[0]
+    assert doc["Dividend Curr"] == "USD"
+    assert doc["FX Rate"] == pytest.approx(1.2)
+    assert doc["Dividend (per share)"] == pytest.approx(0.68)
+    assert doc["Brutto"] == pytest.approx(68.33)
+
+    cdp.save(db_name="test")
+    stored = client["test"]["div"].find_one({"filename": "div.pdf"})
+    assert stored["Dividend Curr"] == "USD"
+    assert stored["FX Rate"] == pytest.approx(1.2)
+    rates = list(client["test"]["fxrates"].find({}, {"_id": 0}))
+    assert rates == [{"base": "EUR", "currency": "USD", "date": datetime(2021, 3, 15), "rate": 1.2}]
+
+
+def test_reparse_updates_changed_only(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+
+    with TextStore(str(tmp_path / "store")) as store:
+        store.append("tax1.pdf", TAXTEXT)
+        store.append("tax2.pdf", TAXTEXT.replace("1A2B3C4D", "5E6F7G8H"))
+
+        cdp = ComDirectParser(inputlist=[], client=client, textstore=store)
+        stats = cdp.reparse(db_name="test")
+        assert stats["inserted"] == 2
+        assert client["test"]["tax"].count_documents({}) == 2
+
+        # same version: nothing to do
+        assert cdp.reparse(db_name="test")["skipped"] == 2
+
+        # new version, tax type detection changed for one document only
+        _id = client["test"]["tax"].find_one({"filename": "tax1.pdf"})["_id"]
+        client["test"]["tax"].update_one({"_id": _id}, {"$set": {"Tax Type": "unknown"}})
+        cdp.PARSER_VERSION += 1
+        stats = cdp.reparse(db_name="test")
+        assert stats == {"skipped": 0, "unchanged": 1, "updated": 1, "inserted": 0, "unknown": 0, "failed": 0}
+        doc = client["test"]["tax"].find_one({"filename": "tax1.pdf"})
+        assert doc["_id"] == _id
+        assert doc["Tax Type"] == "div"
+
+
+def test_reparse_skips_failing_files(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+
+    with TextStore(str(tmp_path / "store")) as store:
+        store.append("a.pdf", TAXTEXT.replace("1A2B3C4D", "A"))
+        # classified as tax, but parse_tax fails
+        store.append("bad.pdf", "Steuerliche Behandlung")
+        store.append("c.pdf", TAXTEXT.replace("1A2B3C4D", "C"))
+
+        cdp = ComDirectParser(inputlist=[], client=client, textstore=store)
+        stats = cdp.reparse(db_name="test")
+        assert stats["inserted"] == 2
+        assert stats["failed"] == 1
+        assert client["test"]["tax"].count_documents({}) == 2
+        assert sorted(client["test"]["parserVersions"].distinct("_id")) == ["a.pdf", "c.pdf"]
+
+        # the failed file is tried again
+        assert cdp.reparse(db_name="test")["failed"] == 1
+
+
+def test_reparse_ignores_category_without_categorizer():
+    mongomock = pytest.importorskip("mongomock")
+    col = mongomock.MongoClient()["test"]["giroTransactions"]
+    stored = [{"filename": "report.pdf", "details": "REWE Markt", "value": -30.0, "category": "groceries"}]
+    col.insert_many([dict(r) for r in stored])
+    parsed = [{k: v for k, v in r.items() if k != "category"} for r in stored]
+
+    cdp = ComDirectParser(inputlist=[], client=None)
+    assert cdp._replaceRecords(col, "report.pdf", parsed, "giroTransactions") == "unchanged"
+
+    # with a categorizer a changed category is an update
+    cdp = ComDirectParser(inputlist=[], client=None, categorizer=Categorizer({"shopping": ["REWE"]}))
+    parsed = [dict(r, category="shopping") for r in parsed]
+    assert cdp._replaceRecords(col, "report.pdf", parsed, "giroTransactions") == "updated"
+    assert col.find_one({"filename": "report.pdf"})["category"] == "shopping"
+
+
+def test_ingest_resumes_after_crash(tmp_path, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(5):
+        (docs / f"tax{i}.pdf").write_bytes(b"")
+    files = [str(docs / f"tax{i}.pdf") for i in range(5)]
+
+    crash = {"tax3.pdf"}
+    extracted = []
+
+    def extract(self, _file):
+        filename = _file.split("/")[-1]
+        if filename in crash:
+            raise KeyboardInterrupt
+        extracted.append(filename)
+        return TAXTEXT.replace("1A2B3C4D", filename)
+
+    monkeypatch.setattr(ComDirectParser, "extract", extract)
+
+    cdp = ComDirectParser(inputlist=[str(docs)], client=client)
+    with pytest.raises(KeyboardInterrupt):
+        cdp.ingest(db_name="test", checkpointEvery=2, filelist=files)
+    assert len(cdp.completedFiles("test")) == 2
+    assert client["test"]["tax"].count_documents({}) == 2
+
+    crash.clear()
+    extracted.clear()
+    stats = ComDirectParser(inputlist=[str(docs)], client=client).ingest(db_name="test", checkpointEvery=2, filelist=files)
+    assert stats == {"skipped": 2, "ingested": 3, "failed": 0}
+    assert sorted(extracted) == ["tax2.pdf", "tax3.pdf", "tax4.pdf"]
+    assert client["test"]["tax"].count_documents({}) == 5
+    assert client["test"]["tax"].find_one({"filename": "tax0.pdf"})["_id"] == files[0] + "#0"
+
+    # killed after the records but before the cursor: the records are replaced, not duplicated
+    client["test"]["ingestCursor"].delete_many({})
+    stats = ComDirectParser(inputlist=[str(docs)], client=client).ingest(db_name="test", checkpointEvery=2)
+    assert stats == {"skipped": 0, "ingested": 5, "failed": 0}
+    assert client["test"]["tax"].count_documents({}) == 5
+
+
+def test_ingest_same_filename_in_different_folders(tmp_path, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    files = [str(tmp_path / folder / "tax.pdf") for folder in ("a", "b")]
+
+    def extract(self, _file):
+        return TAXTEXT.replace("1A2B3C4D", _file.split("/")[-2])
+
+    monkeypatch.setattr(ComDirectParser, "extract", extract)
+
+    stats = ComDirectParser(inputlist=[], client=client).ingest(db_name="test", checkpointEvery=1, filelist=files)
+    assert stats == {"skipped": 0, "ingested": 2, "failed": 0}
+    assert sorted(client["test"]["tax"].distinct("Tax Reference Number")) == ["a", "b"]
+    assert sorted(client["test"]["tax"].distinct("_id")) == [f + "#0" for f in files]
+
+
+def test_ingest_skips_failing_files(tmp_path, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    files = [str(tmp_path / f"tax{i}.pdf") for i in range(4)]
+    broken = {"tax1.pdf"}
+
+    def extract(self, _file):
+        filename = _file.split("/")[-1]
+        # breaks parse_tax
+        if filename in broken:
+            return "Steuerliche Behandlung"
+        return TAXTEXT.replace("1A2B3C4D", filename)
+
+    monkeypatch.setattr(ComDirectParser, "extract", extract)
+
+    cdp = ComDirectParser(inputlist=[], client=client)
+    stats = cdp.ingest(db_name="test", checkpointEvery=2, filelist=files)
+    assert stats == {"skipped": 0, "ingested": 3, "failed": 1}
+    assert client["test"]["tax"].count_documents({}) == 3
+    assert "IndexError" in client["test"]["ingestCursor"].find_one({"_id": files[1]})["failed"]
+
+    # a restart does not hit the broken file again
+    assert cdp.ingest(db_name="test", checkpointEvery=2, filelist=files)["skipped"] == 4
+
+    # after a parser fix
+    broken.clear()
+    stats = cdp.ingest(db_name="test", checkpointEvery=2, filelist=files, retryFailed=True)
+    assert stats == {"skipped": 3, "ingested": 1, "failed": 0}
+    assert client["test"]["tax"].count_documents({}) == 4
+    assert client["test"]["ingestCursor"].find_one({"_id": files[1]})["failed"] is None
     
     
 # ==============================================================================
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.dedup` module."""
+
+import pytest
+
+from comdirectpdfparser import ComDirectParser
+from comdirectpdfparser.dedup import BloomFilter, DocumentIndex, textHash
+from comdirectpdfparser.textstore import TextStore
+
+from .test_comdirectpdfparser import TAXTEXT
+
+
+def test_bloomfilter():
+    bloom = BloomFilter(capacity=1000, errorrate=0.01)
+    items = [f"item{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false = sum(f"other{i}" in bloom for i in range(10000))
+    assert false < 300
+
+
+def test_textHash_normalizes_whitespace():
+    assert textHash("a  b\n\nc ") == textHash("a b c")
+    assert textHash("a b c") != textHash("a b d")
+
+
+def test_parse_skips_duplicates(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    docs = tmp_path / "docs"
+    docs.mkdir()
+
+    # same file twice, and a different file with the same text
+    (docs / "a.pdf").write_bytes(b"pdf a")
+    (docs / "a_copy.pdf").write_bytes(b"pdf a")
+    (docs / "b.pdf").write_bytes(b"pdf b")
+
+    with TextStore(str(tmp_path / "store")) as store:
+        for name in ("a.pdf", "a_copy.pdf", "b.pdf"):
+            store.append(name, TAXTEXT)
+
+        dedup = DocumentIndex(client["test"]["fingerprints"])
+        cdp = ComDirectParser(inputlist=[str(docs)], client=client, textstore=store, dedup=dedup)
+        tax = cdp.parse()[2]
+        assert len(tax) == 1
+        assert len(cdp.duplicates) == 2
+        cdp.save(db_name="test")
+        assert client["test"]["fingerprints"].count_documents({}) == 1
+
+        # a new run knows the fingerprints from the collection
+        dedup = DocumentIndex(client["test"]["fingerprints"])
+        cdp = ComDirectParser(inputlist=[str(docs)], client=client, textstore=store, dedup=dedup)
+        assert len(cdp.parse()[2]) == 0
+        assert len(cdp.duplicates) == 3
+
+
+def test_unsaved_batch_is_not_registered(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.pdf").write_bytes(b"pdf a")
+    (docs / "b.pdf").write_bytes(b"pdf b")
+
+    with TextStore(str(tmp_path / "store")) as store:
+        store.append("a.pdf", TAXTEXT)
+        # breaks parse_tax
+        store.append("b.pdf", "Steuerliche Behandlung")
+
+        dedup = DocumentIndex(client["test"]["fingerprints"])
+        cdp = ComDirectParser(inputlist=[], client=client, textstore=store, dedup=dedup)
+        with pytest.raises(IndexError):
+            cdp.parse([str(docs / "a.pdf"), str(docs / "b.pdf")])
+        # the failed batch is dropped, as the watch daemon does
+        cdp.clear()
+        cdp.save(db_name="test")
+        assert client["test"]["fingerprints"].count_documents({}) == 0
+
+        assert len(cdp.parse([str(docs / "a.pdf")])[2]) == 1
+        assert cdp.duplicates == []
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_bloomfilter
+
+    the_test_you_want_to_debug()
+    print("-*# finished #*-")
+# ==============================================================================
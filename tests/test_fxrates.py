@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.fxrates` module."""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from comdirectpdfparser.fxrates import FXRateStore
+
+
+def _store():
+    fx = FXRateStore()
+    fx.add("USD", datetime(2021, 1, 10), 1.20)
+    fx.add("USD", datetime(2021, 1, 1), 1.10)
+    fx.add("USD", datetime(2021, 2, 1), 1.30)
+    fx.add("GBP", datetime(2021, 1, 1), 0.90)
+    return fx
+
+
+def test_rate_nearest_date():
+    fx = _store()
+    assert fx.rate("USD", datetime(2020, 6, 1)) == 1.10
+    assert fx.rate("USD", datetime(2021, 1, 4)) == 1.10
+    # tie goes to the earlier date
+    assert fx.rate("USD", datetime(2021, 1, 21)) == 1.20
+    assert fx.rate("USD", datetime(2021, 1, 25)) == 1.30
+    assert fx.rate("USD", datetime(2022, 1, 1)) == 1.30
+    assert fx.rate("EUR", datetime(2022, 1, 1)) == 1.0
+    assert np.isnan(fx.rate("CHF", datetime(2022, 1, 1)))
+
+
+def test_convert_matches_scalar_lookup():
+    fx = _store()
+    currencies = ["USD", "EUR", "GBP", "USD", "CHF", "USD"]
+    dates = ["2021-01-04", "2021-01-04", "2021-03-01", "2021-01-21", "2021-01-01", "2021-01-25"]
+    amounts = [110.0, 5.0, 9.0, 12.0, 1.0, 13.0]
+    converted = fx.convert(amounts, currencies, dates)
+    np.testing.assert_allclose(converted[[0, 1, 2, 3, 5]], [100.0, 5.0, 10.0, 10.0, 10.0])
+    assert np.isnan(converted[4])
+    expected = [a / fx.rate(c, datetime.fromisoformat(d)) for a, c, d in zip(amounts, currencies, dates)]
+    np.testing.assert_allclose(converted, expected)
+
+
+def test_collect_save_load():
+    mongomock = pytest.importorskip("mongomock")
+    col = mongomock.MongoClient()["test"]["fxrates"]
+
+    fx = FXRateStore()
+    fx.collect({"Account curr": "EUR", "Dividend Curr": "USD", "Date": datetime(2021, 1, 1), "FX Rate": 1.1})
+    fx.collect({"Account curr": "EUR", "Dividend Curr": "EUR", "Date": datetime(2021, 1, 1), "FX Rate": 1.0})
+    fx.collect({"Account curr": "EUR", "Date": datetime(2021, 1, 1)})
+    assert fx.currencies() == ["USD"]
+    fx.save(col)
+    fx.save(col)
+    assert col.count_documents({}) == 1
+
+    assert FXRateStore().load(col).rate("USD", datetime(2021, 5, 1)) == 1.1
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_rate_nearest_date
+
+    the_test_you_want_to_debug()
+    print("-*# finished #*-")
+# ==============================================================================
@@ -3,9 +3,14 @@
 
 """Tests for `comdirectpdfparser` package."""
 
+import json
+import logging
+import sys
+
 import pytest
 
 import comdirectpdfparser.jlog
+from comdirectpdfparser.jlog import JSONFormatter
 
 def test_greet():
     expected = "Hello John!"
@@ -13,6 +18,21 @@ def test_greet():
     assert greeting==expected
 
 
+def test_json_formatter():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("x").makeRecord(
+            "x", logging.ERROR, __file__, 1, "a %s", ("b",), sys.exc_info(), extra={"doc": "a.pdf"}
+        )
+    obj = json.loads(JSONFormatter().format(record))
+    assert obj["message"] == "a b"
+    assert obj["doc"] == "a.pdf"
+    assert "ValueError: boom" in obj["exc_info"]
+    # the record itself is left intact for other handlers
+    assert record.msg == "a %s"
+
+
 # ==============================================================================
 # The code below is for debugging a particular test in eclipse/pydev.
 # (normally all tests are run with pytest)
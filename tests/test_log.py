@@ -3,9 +3,39 @@
 
 """Tests for `comdirectpdfparser` package."""
 
+import json
+import logging
+import multiprocessing
+
 import pytest
 
 import comdirectpdfparser.log
+from comdirectpdfparser import log
+
+CONFIG = """
+[loggers]
+keys=root
+
+[handlers]
+keys=file
+
+[formatters]
+keys=json
+
+[logger_root]
+level=DEBUG
+handlers=file
+
+[handler_file]
+class=FileHandler
+level=DEBUG
+formatter=json
+args=({logfile!r},)
+
+[formatter_json]
+class=comdirectpdfparser.jlog.JSONFormatter
+"""
+
 
 def test_greet():
     expected = "Hello John!"
@@ -13,6 +43,50 @@ def test_greet():
     assert greeting==expected
 
 
+@pytest.fixture
+def reset_log():
+    yield
+    log.stop()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    log._configured = False
+
+
+def _worker(q):
+    log.setup_worker(q)
+    logging.getLogger("worker").info("from %s", "worker")
+
+
+def test_sampling_filter():
+    f = log.SamplingFilter({"comdirectpdfparser.documents": 0.0, "comdirectpdfparser": 1.0})
+    rec = lambda name, level: logging.makeLogRecord({"name": name, "levelno": level})
+    assert not f.filter(rec("comdirectpdfparser.documents", logging.DEBUG))
+    assert not f.filter(rec("comdirectpdfparser.documents.x", logging.INFO))
+    assert f.filter(rec("comdirectpdfparser.documents", logging.WARNING))
+    assert f.filter(rec("comdirectpdfparser", logging.DEBUG))
+    assert f.filter(rec("other", logging.DEBUG))
+
+
+def test_setup_queue_with_worker_process(tmp_path, reset_log):
+    logfile = tmp_path / "test.log"
+    config = tmp_path / "log.ini"
+    config.write_text(CONFIG.format(logfile=str(logfile)))
+
+    ctx = multiprocessing.get_context("spawn")
+    q = log.setup_queue(config, queue=ctx.Queue(), sampling={"noisy": 0.0})
+    logging.getLogger("main").info("from %s", "main")
+    logging.getLogger("noisy").debug("dropped")
+
+    p = ctx.Process(target=_worker, args=(q,))
+    p.start()
+    p.join()
+    log.stop()
+
+    lines = [json.loads(line) for line in logfile.read_text().splitlines()]
+    assert sorted(line["message"] for line in lines) == ["from main", "from worker"]
+
+
 # ==============================================================================
 # The code below is for debugging a particular test in eclipse/pydev.
 # (normally all tests are run with pytest)
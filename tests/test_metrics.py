@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.metrics` module."""
+
+import json
+import pathlib
+import tempfile
+import urllib.request
+
+import pytest
+
+from comdirectpdfparser import ComDirectParser
+from comdirectpdfparser.metrics import Metrics, MetricsServer, SnapshotWriter
+from comdirectpdfparser.textstore import TextStore
+
+from .test_comdirectpdfparser import TAXTEXT
+
+
+def test_snapshot():
+    metrics = Metrics()
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        metrics.observe("parse", seconds)
+    metrics.document("div")
+    metrics.document("div")
+    metrics.document("tax")
+    metrics.write("div", 2)
+    metrics.queue("files", 7)
+
+    snap = metrics.snapshot()
+    assert snap["documents"] == {"div": 2, "tax": 1}
+    assert snap["documentsPerSecond"]["div"] > 0
+    assert snap["latency"]["parse"]["count"] == 4
+    assert snap["latency"]["parse"]["p50"] == pytest.approx(0.25)
+    assert snap["queues"] == {"files": 7}
+    assert snap["written"] == {"div": 2}
+    json.dumps(snap)
+
+
+def test_prometheus():
+    metrics = Metrics()
+    metrics.observe("extract", 0.5)
+    metrics.document("div")
+    metrics.write("div", 3)
+    metrics.queue("files", 1)
+
+    text = metrics.prometheus()
+    assert '# TYPE comdirect_documents_total counter' in text
+    assert 'comdirect_documents_total{type="div"} 1' in text
+    assert 'comdirect_extract_seconds{quantile="0.5"} 0.5' in text
+    assert "comdirect_extract_seconds_count 1" in text
+    assert 'comdirect_queue_depth{queue="files"} 1' in text
+    assert 'comdirect_mongo_written_total{collection="div"} 3' in text
+
+
+def test_server_and_snapshot_writer(tmp_path):
+    metrics = Metrics()
+    metrics.document("tax")
+
+    server = MetricsServer(metrics, port=0).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert 'comdirect_documents_total{type="tax"} 1' in response.read().decode()
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics.json") as response:
+            assert json.loads(response.read())["documents"] == {"tax": 1}
+    finally:
+        server.stop()
+
+    path = tmp_path / "metrics.json"
+    writer = SnapshotWriter(metrics, str(path), interval=60).start()
+    writer.stop()
+    assert json.loads(path.read_text())["documents"] == {"tax": 1}
+
+
+def test_parser_metrics(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    with TextStore(str(tmp_path / "store")) as store:
+        for i in range(3):
+            (docs / f"tax{i}.pdf").write_bytes(b"")
+            store.append(f"tax{i}.pdf", TAXTEXT.replace("1A2B3C4D", f"REF{i}"))
+
+        metrics = Metrics()
+        cdp = ComDirectParser(inputlist=[str(docs)], client=client, textstore=store, metrics=metrics)
+        cdp.parse()
+        cdp.save(db_name="test")
+
+    snap = metrics.snapshot()
+    assert snap["documents"] == {"tax": 3}
+    assert snap["latency"]["extract"]["count"] == 3
+    assert snap["latency"]["parse"]["count"] == 3
+    assert snap["queues"] == {"files": 0}
+    assert snap["written"] == {"tax": 3}
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_parser_metrics
+
+    the_test_you_want_to_debug(pathlib.Path(tempfile.mkdtemp()))
+    print("-*# finished #*-")
+# ==============================================================================
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.numparse` module."""
+
+import re
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from comdirectpdfparser.numparse import parseNumber, parseNumbers
+
+VALID = {
+    "0": 0.0,
+    "12,5": 12.5,
+    "-1.234,56": -1234.56,
+    "+1.234.567,0": 1234567.0,
+    "150,000": 150.0,
+    " 73,62 ": 73.62,
+}
+
+INVALID = ["1.234", "1234.567,00", "1.23,00", "12,", ",5", "1,2,3", "1,234.5", "+-1", "", "1e5", "nan", "1 234"]
+
+
+def test_parseNumber():
+    for s, expected in VALID.items():
+        assert parseNumber(s) == expected
+    assert parseNumber("0,1", decimal=True) + parseNumber("0,2", decimal=True) == Decimal("0.3")
+
+
+@pytest.mark.parametrize("s", INVALID)
+def test_parseNumber_invalid(s):
+    with pytest.raises(ValueError):
+        parseNumber(s)
+
+
+def test_parseNumbers():
+    values = pd.Series(list(VALID))
+    np.testing.assert_array_equal(parseNumbers(values), np.array(list(VALID.values())))
+    assert parseNumbers(["1.000,01", "0,02"], decimal=True).sum() == Decimal("1000.03")
+    assert len(parseNumbers([])) == 0
+
+
+@pytest.mark.parametrize("s", INVALID + ["1\n2"])
+def test_parseNumbers_invalid(s):
+    with pytest.raises(ValueError, match=re.escape(repr(s.strip()))):
+        parseNumbers(["1,00", s, "2,00"])
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_parseNumbers
+
+    the_test_you_want_to_debug()
+    print("-*# finished #*-")
+# ==============================================================================
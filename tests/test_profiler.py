@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.profiler` module."""
+
+import json
+import pathlib
+import tempfile
+
+import pytest
+
+from comdirectpdfparser import ComDirectParser
+from comdirectpdfparser.profiler import PatternProfiler
+
+from .test_comdirectpdfparser import TAXTEXT
+
+
+def test_dump_slow_document(tmp_path):
+    profiler = PatternProfiler(str(tmp_path), threshold=0.0)
+    cdp = ComDirectParser(inputlist=[], client=None, profiler=profiler)
+    parsed = cdp.parse_document("tax.pdf", TAXTEXT)
+    assert parsed["Tax Reference Number"] == "1A2B3C4D"
+
+    assert list(profiler.flagged) == ["tax.pdf"]
+    assert (tmp_path / "tax.pdf.txt").read_text(encoding="utf-8") == TAXTEXT
+
+    breakdown = json.loads((tmp_path / "tax.pdf.json").read_text(encoding="utf-8"))
+    methods = {p["method"] for p in breakdown["patterns"]}
+    assert {"classify", "parse_account", "parse_tax"} <= methods
+    seconds = [p["seconds"] for p in breakdown["patterns"]]
+    assert seconds == sorted(seconds, reverse=True)
+
+
+def test_fast_document_not_dumped(tmp_path):
+    profiler = PatternProfiler(str(tmp_path), threshold=60.0)
+    cdp = ComDirectParser(inputlist=[], client=None, profiler=profiler)
+    cdp.parse_document("tax.pdf", TAXTEXT)
+    assert profiler.flagged == {}
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_dump_on_failure(tmp_path):
+    profiler = PatternProfiler(str(tmp_path), threshold=0.0)
+    cdp = ComDirectParser(inputlist=[], client=None, profiler=profiler)
+    with pytest.raises(IndexError):
+        cdp.parse_document("bad.pdf", "Steuerliche Behandlung")
+    assert (tmp_path / "bad.pdf.json").exists()
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_dump_slow_document
+
+    the_test_you_want_to_debug(pathlib.Path(tempfile.mkdtemp()))
+    print("-*# finished #*-")
+# ==============================================================================
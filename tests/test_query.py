@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.query` module."""
+
+from datetime import datetime
+
+import pytest
+
+from comdirectpdfparser import ComDirectParser
+from comdirectpdfparser.query import ComDirectQuery
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def _client():
+    client = mongomock.MongoClient()
+    ComDirectParser(inputlist=[], client=client).ensureIndexes("test")
+    client["test"]["div"].insert_many(
+        [
+            {"filename": f"d{i}.pdf", "isin": isin, "Account": "DE1", "Date": date, "Net Before Tax": net}
+            for i, (isin, date, net) in enumerate(
+                [
+                    ("US0378331005", datetime(2024, 12, 31), 1.0),
+                    ("US0378331005", datetime(2025, 2, 1), 2.0),
+                    ("US0378331005", datetime(2025, 5, 1), 3.0),
+                    ("DE0007164600", datetime(2025, 5, 1), 4.0),
+                ]
+            )
+        ]
+    )
+    return client
+
+
+def test_dividends_by_isin_and_year():
+    q = ComDirectQuery(_client(), "test")
+    df = q.dividends(isin="US0378331005", start=datetime(2025, 1, 1), end=datetime(2026, 1, 1))
+    assert df["Net Before Tax"].tolist() == [2.0, 3.0]
+    assert q.dividendTotal(isin="US0378331005", start=datetime(2025, 1, 1), end=datetime(2026, 1, 1)) == 5.0
+    assert q.dividendTotal(account="DE1", start=datetime(2025, 1, 1)) == 9.0
+    assert q.dividendTotal(isin="XX") == 0.0
+
+
+def test_fields_projection():
+    q = ComDirectQuery(_client(), "test")
+    df = q.dividends(account="DE1", fields=["Account", "Date", "Net Before Tax"])
+    assert list(df.columns) == ["Account", "Date", "Net Before Tax"]
+    assert df["Date"].is_monotonic_increasing
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_dividends_by_isin_and_year
+
+    the_test_you_want_to_debug()
+    print("-*# finished #*-")
+# ==============================================================================
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.tenants` module."""
+
+import pytest
+
+from comdirectpdfparser import ComDirectParser
+from comdirectpdfparser.tenants import TenantIngest, roundRobin
+
+from .test_comdirectpdfparser import TAXTEXT
+
+
+def test_roundRobin():
+    batches = {"a": [[1], [2], [3], [4]], "b": [[5]], "c": [], "d": [[6], [7]]}
+    assert [tenant for tenant, _ in roundRobin(batches)] == ["a", "b", "d", "a", "d", "a", "a"]
+    assert [batch for tenant, batch in roundRobin(batches) if tenant == "a"] == [[1], [2], [3], [4]]
+
+
+def _folders(tmp_path, sizes):
+    tenants = {}
+    for tenant, n in sizes.items():
+        folder = tmp_path / tenant
+        folder.mkdir()
+        for i in range(n):
+            (folder / f"{tenant}{i}.pdf").write_bytes(b"")
+        tenants[tenant] = [str(folder)]
+    return tenants
+
+
+def _extract(self, _file):
+    filename = _file.split("/")[-1]
+    if filename.startswith("broken"):
+        raise ValueError(filename)
+    return TAXTEXT.replace("1A2B3C4D", filename.replace(".pdf", ""))
+
+
+def test_run(tmp_path, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(ComDirectParser, "extract", _extract)
+
+    tenants = _folders(tmp_path, {"large": 7, "small": 2, "broken": 1})
+    stats = TenantIngest(tenants, client, workers=2, batchsize=2).run()
+
+    assert stats["large"] == {"batches": 4, "failed": 0, "files": 7, "failedFiles": 0}
+    assert stats["small"] == {"batches": 1, "failed": 0, "files": 2, "failedFiles": 0}
+    assert stats["broken"] == {"batches": 1, "failed": 0, "files": 0, "failedFiles": 1}
+
+    assert client["ComDirect_large"]["tax"].count_documents({}) == 7
+    assert sorted(client["ComDirect_small"]["tax"].distinct("Tax Reference Number")) == ["small0", "small1"]
+
+
+def test_unshared_arguments():
+    with pytest.raises(ValueError, match="textstore, dedup"):
+        TenantIngest({}, None, textstore=object(), dedup=object(), metrics=None)
+    TenantIngest({}, None, textstore=None)
+
+
+def test_fair_order(tmp_path, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.setattr(ComDirectParser, "extract", _extract)
+
+    order = []
+
+    class _Ingest(TenantIngest):
+        def ingestBatch(self, tenant, files):
+            order.append(tenant)
+            return super().ingestBatch(tenant, files)
+
+    tenants = _folders(tmp_path, {"large": 8, "small": 2})
+    _Ingest(tenants, mongomock.MongoClient(), workers=1, batchsize=2).run()
+    # the small tenant is not queued behind the whole large archive
+    assert order == ["large", "small", "large", "large", "large"]
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_roundRobin
+
+    the_test_you_want_to_debug()
+    print("-*# finished #*-")
+# ==============================================================================
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.textstore` module."""
+
+import pathlib
+import tempfile
+
+from comdirectpdfparser.textstore import TextStore
+
+
+def test_append_get(tmp_path):
+    path = str(tmp_path / "store")
+    with TextStore(path) as store:
+        store.append("a.pdf", "Dividendengutschrift äöü")
+        store.append("b.pdf", "")
+        assert store.get("a.pdf") == "Dividendengutschrift äöü"
+        assert store.get("b.pdf") == ""
+        store.append("c.pdf", "Finanzreport")
+        assert store.get("c.pdf") == "Finanzreport"
+
+    with TextStore(path) as store:
+        assert len(store) == 3
+        assert "a.pdf" in store
+        assert list(store.items())[2] == ("c.pdf", "Finanzreport")
+
+
+def test_last_append_wins(tmp_path):
+    with TextStore(str(tmp_path / "store")) as store:
+        store.append("a.pdf", "old")
+        store.append("a.pdf", "new")
+        assert len(store) == 1
+        assert store.get("a.pdf") == "new"
+
+
+def test_source(tmp_path):
+    path = str(tmp_path / "store")
+    with TextStore(path) as store:
+        store.append("a.pdf", "a", source="/docs/a.pdf")
+        store.append("b.pdf", "b")
+        assert store.source("a.pdf") == "/docs/a.pdf"
+        assert store.source("b.pdf") is None
+
+    with TextStore(path) as store:
+        assert store.source("a.pdf") == "/docs/a.pdf"
+        assert store.source("b.pdf") is None
+        store.append("a.pdf", "a2")
+        assert store.source("a.pdf") is None
+
+def test_truncated_index_line_ignored(tmp_path):
+    path = str(tmp_path / "store")
+    with TextStore(path) as store:
+        store.append("a.pdf", "text")
+    with open(path + ".idx", "a") as f:
+        f.write("4\t100\tb.pdf")
+
+    with TextStore(path) as store:
+        assert list(store) == ["a.pdf"]
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_append_get
+
+    the_test_you_want_to_debug(pathlib.Path(tempfile.mkdtemp()))
+    print("-*# finished #*-")
+# ==============================================================================
@@ -3,13 +3,47 @@
 
 """Tests for `comdirectpdfparser` package."""
 
+import io
+
 import pytest
 
 import comdirectpdfparser.utils
 
+from datetime import datetime
+
 def test_greet():
     pass
 
+
+def test_stringToDate():
+    assert comdirectpdfparser.utils.stringToDate("24.03.2021") == datetime(2021, 3, 24)
+    assert comdirectpdfparser.utils.stringToDate("24.03.21") == datetime(2021, 3, 24)
+    with pytest.raises(ValueError):
+        comdirectpdfparser.utils.stringToDate("2021-03-24")
+
+
+def test_readPages(tmp_path, monkeypatch):
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    for _ in range(5):
+        writer.add_blank_page(width=200, height=200)
+    path = tmp_path / "doc.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+
+    def from_buffer(buffer):
+        return {"content": f"{len(pypdf.PdfReader(io.BytesIO(buffer)).pages)} pages"}
+
+    monkeypatch.setattr(comdirectpdfparser.utils.parser, "from_buffer", from_buffer)
+
+    raw, pages = comdirectpdfparser.utils.readPages(str(path), 0, 2)
+    assert pages == 5
+    assert raw["content"] == "2 pages"
+
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+    with pytest.raises(ValueError):
+        comdirectpdfparser.utils.readPages(str(tmp_path / "broken.pdf"))
+
 # ==============================================================================
 # The code below is for debugging a particular test in eclipse/pydev.
 # (normally all tests are run with pytest)
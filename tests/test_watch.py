@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.watch` module."""
+
+import pathlib
+import tempfile
+import threading
+import time
+
+import pytest
+
+from comdirectpdfparser import ComDirectParser
+from comdirectpdfparser.textstore import TextStore
+from comdirectpdfparser.watch import WatchDaemon
+
+from .test_comdirectpdfparser import TAXTEXT
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def _wait(condition, timeout=10.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_watch(tmp_path, polling):
+    client = mongomock.MongoClient()
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "old.pdf").write_bytes(b"")
+
+    with TextStore(str(tmp_path / "store")) as store:
+        for name in ("old", "new"):
+            store.append(f"{name}.pdf", TAXTEXT.replace("1A2B3C4D", name))
+
+        cdp = ComDirectParser(inputlist=[str(docs)], client=client, textstore=store)
+        daemon = WatchDaemon(cdp, db_name="test", debounce=0.2, interval=0.05, polling=polling)
+        thread = threading.Thread(target=daemon.run)
+        thread.start()
+        try:
+            time.sleep(0.2)
+            # partially written file, completed later
+            with open(docs / "new.pdf", "wb") as f:
+                f.write(b"%PDF")
+                f.flush()
+                time.sleep(0.1)
+                assert client["test"]["tax"].count_documents({}) == 0
+                f.write(b"-1.4")
+            # dot files are ignored
+            (docs / ".new.pdf.part").write_bytes(b"")
+
+            assert _wait(lambda: client["test"]["tax"].count_documents({}) == 1)
+        finally:
+            daemon.stop()
+            thread.join()
+
+    assert client["test"]["tax"].find_one()["filename"] == "new.pdf"
+    assert daemon.seen == {str(docs / "old.pdf"), str(docs / "new.pdf")}
+
+
+def test_tick_isolates_failures(tmp_path):
+    client = mongomock.MongoClient()
+    docs = tmp_path / "docs"
+    docs.mkdir()
+
+    with TextStore(str(tmp_path / "store")) as store:
+        for name in ("a", "b"):
+            (docs / f"{name}.pdf").write_bytes(b"")
+            store.append(f"{name}.pdf", TAXTEXT.replace("1A2B3C4D", name))
+        # breaks parse_tax
+        (docs / "bad.pdf").write_bytes(b"")
+        store.append("bad.pdf", "Steuerliche Behandlung")
+
+        cdp = ComDirectParser(inputlist=[str(docs)], client=client, textstore=store)
+        daemon = WatchDaemon(cdp, db_name="test", debounce=0, interval=0.05, polling=True)
+
+        # mongodb not reachable: the batch is kept for a retry
+        save = cdp.save
+        cdp.save = lambda db_name: (_ for _ in ()).throw(ConnectionError("down"))
+        daemon.tick()
+        assert daemon.tick() == []
+        assert sorted(daemon.retry) == [str(docs / "a.pdf"), str(docs / "b.pdf")]
+        assert daemon.seen == {str(docs / "bad.pdf")}
+        assert daemon.backoff == 0.05
+
+        # still within the backoff
+        cdp.save = save
+        daemon.retryAt = time.monotonic() + 60
+        assert daemon.tick() == []
+
+        daemon.retryAt = 0
+        assert sorted(daemon.tick()) == [str(docs / "a.pdf"), str(docs / "b.pdf")]
+        assert daemon.retry == [] and daemon.backoff == 0
+
+    assert client["test"]["tax"].count_documents({}) == 2
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_watch
+
+    the_test_you_want_to_debug(pathlib.Path(tempfile.mkdtemp()), False)
+    print("-*# finished #*-")
+# ==============================================================================
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `comdirectpdfparser.workqueue` module."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from comdirectpdfparser.textstore import TextStore
+from comdirectpdfparser.workqueue import LeaseQueue, Worker
+
+from .test_comdirectpdfparser import TAXTEXT
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def test_claim_complete_requeue():
+    client = mongomock.MongoClient()
+    queue = LeaseQueue(client["test"]["workQueue"], lease=60)
+
+    assert queue.enqueue(["/a.pdf", "/b.pdf", "/c.pdf"]) == 3
+    assert queue.enqueue(["/a.pdf"]) == 0
+
+    first = queue.claim("w1", batchsize=2)
+    second = queue.claim("w2", batchsize=2)
+    assert len(first) == 2 and len(second) == 1
+    assert not set(first) & set(second)
+    assert queue.claim("w3") == []
+
+    assert queue.complete("w1", first) == 2
+    # not owned by w1
+    assert queue.complete("w1", second) == 0
+
+    # w2 crashed, its lease expires
+    client["test"]["workQueue"].update_many(
+        {"worker": "w2"}, {"$set": {"leaseUntil": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+    assert queue.heartbeat("w2", second) == 1
+    assert queue.claim("w3") == []
+    client["test"]["workQueue"].update_many(
+        {"worker": "w2"}, {"$set": {"leaseUntil": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+    assert queue.claim("w3") == second
+    assert queue.counts() == {"pending": 0, "leased": 1, "done": 2, "failed": 0}
+
+
+def test_release_fails_after_maxattempts():
+    client = mongomock.MongoClient()
+    queue = LeaseQueue(client["test"]["workQueue"], maxattempts=2)
+    queue.enqueue(["/a.pdf"])
+
+    queue.release("w1", queue.claim("w1"), "boom")
+    assert queue.counts()["pending"] == 1
+    queue.release("w1", queue.claim("w1"), "boom")
+    assert queue.counts()["failed"] == 1
+    assert queue.claim("w1") == []
+
+
+def test_expired_fails_after_maxattempts():
+    client = mongomock.MongoClient()
+    col = client["test"]["workQueue"]
+    queue = LeaseQueue(col, maxattempts=2)
+    queue.enqueue(["/a.pdf", "/b.pdf"])
+
+    # the file kills its worker, release() is never reached
+    for _ in range(5):
+        queue.claim("w1", batchsize=1)
+        col.update_many({}, {"$set": {"leaseUntil": datetime.utcnow() - timedelta(seconds=1)}})
+    assert col.find_one({"_id": "/a.pdf"})["attempts"] == 2
+    assert col.find_one({"_id": "/b.pdf"})["attempts"] == 2
+
+    assert queue.requeueExpired() == 0
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 0, "failed": 2}
+
+
+def test_worker_survives_save_failure(tmp_path, monkeypatch):
+    client = mongomock.MongoClient()
+    queue = LeaseQueue(client["test"]["workQueue"])
+
+    with TextStore(str(tmp_path / "store")) as store:
+        store.append("tax0.pdf", TAXTEXT)
+        queue.enqueue([str(tmp_path / "tax0.pdf")])
+
+        def save(self, db_name):
+            raise ConnectionError("mongodb not reachable")
+
+        monkeypatch.setattr("comdirectpdfparser.ComDirectParser.save", save)
+        worker = Worker(client, queue, db_name="test", textstore=store, retryInterval=0.01, maxBackoff=0.04)
+        # failed saves are not counted as attempts, the worker backs off
+        backoffs = []
+        for _ in range(5):
+            assert worker.runOnce() == 1
+            backoffs.append(worker.backoff)
+        assert backoffs == [0.01, 0.02, 0.04, 0.04, 0.04]
+        assert queue.counts()["pending"] == 1
+        assert client["test"]["workQueue"].find_one()["attempts"] == 0
+
+        monkeypatch.undo()
+        assert worker.run(exitWhenEmpty=True) == 1
+        assert worker.backoff == 0.0
+
+    assert client["test"]["tax"].count_documents({}) == 1
+    assert queue.counts()["done"] == 1
+
+
+def test_worker(tmp_path):
+    client = mongomock.MongoClient()
+    queue = LeaseQueue(client["test"]["workQueue"])
+
+    with TextStore(str(tmp_path / "store")) as store:
+        paths = []
+        for i in range(5):
+            path = str(tmp_path / f"tax{i}.pdf")
+            store.append(f"tax{i}.pdf", TAXTEXT.replace("1A2B3C4D", f"REF{i}"))
+            paths.append(path)
+        # breaks parse_tax
+        store.append("bad.pdf", "Steuerliche Behandlung")
+        paths.append(str(tmp_path / "bad.pdf"))
+        queue.enqueue(paths)
+
+        worker = Worker(client, queue, db_name="test", batchsize=4, textstore=store)
+        assert worker.run(exitWhenEmpty=True) == 8
+
+    assert client["test"]["tax"].count_documents({}) == 5
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 5, "failed": 1}
+
+
+# ==============================================================================
+# The code below is for debugging a particular test in eclipse/pydev.
+# (normally all tests are run with pytest)
+# ==============================================================================
+if __name__ == "__main__":
+    the_test_you_want_to_debug = test_claim_complete_requeue
+
+    the_test_you_want_to_debug()
+    print("-*# finished #*-")
+# ==============================================================================